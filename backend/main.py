@@ -1,19 +1,25 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 import uvicorn
 import os
 import json
 from datetime import datetime
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional, Callable
 import shutil
+import logging
 
 from models.sperm_analyzer import SpermAnalyzer
 from models.data_processor import DataProcessor
 from utils.file_handler import FileHandler
-from utils.response_models import AnalysisResponse, AnalysisResult
+from utils.job_queue import JobQueue
+from utils.response_models import AnalysisResponse, AnalysisResult, JobStatus
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Sperm Analyzer AI API",
@@ -40,11 +46,26 @@ sperm_analyzer = SpermAnalyzer()
 data_processor = DataProcessor()
 file_handler = FileHandler()
 
+async def _initialize_model():
+    """Load and warm up the model; GET /ready reports the outcome"""
+    try:
+        await sperm_analyzer.initialize_model()
+        print("🚀 Sperm Analyzer AI API is ready!")
+    except Exception as e:
+        print(f"❌ Model initialization failed: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the AI model on startup"""
-    await sperm_analyzer.initialize_model()
-    print("🚀 Sperm Analyzer AI API is ready!")
+    """Start serving at once and load the AI model in the background"""
+    sperm_analyzer.check_model_available()
+    app.state.model_loading = asyncio.create_task(_initialize_model())
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job and inference workers"""
+    await job_queue.stop()
+    sperm_analyzer.shutdown()
 
 @app.get("/")
 async def root():
@@ -54,6 +75,14 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once the model is loaded and warmed up, 503 until then
+    """
+    readiness = sperm_analyzer.get_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 @app.post("/api/upload", response_model=Dict[str, Any])
 async def upload_file(file: UploadFile = File(...)):
     """
@@ -82,53 +111,200 @@ async def upload_file(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+# Seconds without progress after which an SSE comment keeps proxies from closing the stream
+SSE_KEEPALIVE_SECONDS = 15
+
+def _resolve_upload(file_id: str):
+    """Return the path and type of an uploaded file, or raise 404/400"""
+    file_path = file_handler.get_file_path(file_id)
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    file_type = file_handler.get_file_type(file_path)
+    if file_type not in ("image", "video"):
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    return file_path, file_type
+
+async def _analyze_and_save(file_id: str, file_path: str, file_type: str, detections_format: str,
+                            progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> AnalysisResponse:
+    """Run the analysis, post-process it, render charts and store the results"""
+    # Perform analysis
+    if file_type == "image":
+        analysis_result = await sperm_analyzer.analyze_image(file_path, detections_format)
+    else:
+        analysis_result = await sperm_analyzer.analyze_video(file_path, detections_format, progress_callback)
+    
+    # Process and enhance results
+    processed_results = data_processor.process_analysis_results(analysis_result)
+    
+    # Generate visualizations
+    chart_paths = await data_processor.generate_charts(processed_results, file_id)
+    
+    # Save results to database/file
+    result_id = await data_processor.save_results(file_id, processed_results, chart_paths)
+    
+    return AnalysisResponse(
+        success=True,
+        result_id=result_id,
+        file_id=file_id,
+        analysis_type=file_type,
+        results=processed_results,
+        charts=chart_paths,
+        analysis_time=datetime.now().isoformat()
+    )
+
 @app.post("/api/analyze/{file_id}", response_model=AnalysisResponse)
-async def analyze_file(file_id: str, background_tasks: BackgroundTasks):
+async def analyze_file(file_id: str, background_tasks: BackgroundTasks,
+                       detections_format: Literal["records", "columnar"] = "records"):
     """
     Analyze uploaded file using YOLOv8 model
+    
+    detections_format=columnar returns detections as one dict of lists
+    instead of one dict per detection.
     """
     try:
-        # Get file path from file_id
-        file_path = file_handler.get_file_path(file_id)
-        if not file_path or not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="File not found")
-        
-        # Determine file type
-        file_type = file_handler.get_file_type(file_path)
-        
-        # Perform analysis
-        if file_type == "image":
-            analysis_result = await sperm_analyzer.analyze_image(file_path)
-        elif file_type == "video":
-            analysis_result = await sperm_analyzer.analyze_video(file_path)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type")
+        file_path, file_type = _resolve_upload(file_id)
         
-        # Process and enhance results
-        processed_results = data_processor.process_analysis_results(analysis_result)
-        
-        # Generate visualizations
-        chart_paths = await data_processor.generate_charts(processed_results, file_id)
-        
-        # Save results to database/file
-        result_id = await data_processor.save_results(file_id, processed_results, chart_paths)
+        response = await _analyze_and_save(file_id, file_path, file_type, detections_format)
         
         # Clean up original file in background
         background_tasks.add_task(file_handler.cleanup_file, file_path)
         
-        return AnalysisResponse(
-            success=True,
-            result_id=result_id,
-            file_id=file_id,
-            analysis_type=file_type,
-            results=processed_results,
-            charts=chart_paths,
-            analysis_time=datetime.now().isoformat()
-        )
+        return response
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+class _StreamedAnalysis:
+    """One analysis streamed over SSE, fanned out to every connected client"""
+    
+    def __init__(self, file_type: str):
+        self.file_type = file_type
+        self.subscribers: List[asyncio.Queue] = []
+        self.outcome: Optional[tuple] = None  # The "result" or "error" event, for late subscribers
+        self.task: Optional[asyncio.Task] = None
+    
+    def publish(self, event: str, data: Dict[str, Any]):
+        if event in ("result", "error"):
+            self.outcome = (event, data)
+        for events in self.subscribers:
+            events.put_nowait((event, data))
+    
+    def subscribe(self) -> asyncio.Queue:
+        events: asyncio.Queue = asyncio.Queue()
+        if self.outcome is not None:
+            events.put_nowait(self.outcome)
+        self.subscribers.append(events)
+        return events
+
+# Streamed analyses still running, by file id: a reconnecting client (EventSource
+# reconnects on its own) follows the running analysis instead of starting another
+_streamed_analyses: Dict[str, _StreamedAnalysis] = {}
+
+@app.get("/api/analyze/{file_id}/stream")
+async def analyze_file_stream(file_id: str, detections_format: Literal["records", "columnar"] = "records"):
+    """
+    Analyze uploaded file and stream progress as Server-Sent Events
+    
+    Sends "progress" events (frames processed, analysis fps, running sperm
+    counts and provisional motility) while a video is analyzed, then one
+    "result" event with the same body as POST /api/analyze/{file_id}, or an
+    "error" event. The analysis finishes and is saved even if the client
+    disconnects; connecting again while it runs follows the same analysis.
+    Clients should close the stream after "result" or "error", since the
+    upload is removed once the analysis is done.
+    """
+    analysis = _streamed_analyses.get(file_id)
+    if analysis is None:
+        file_path, file_type = _resolve_upload(file_id)
+        analysis = _StreamedAnalysis(file_type)
+        _streamed_analyses[file_id] = analysis
+        loop = asyncio.get_running_loop()
+        
+        def on_progress(progress: Dict[str, Any]):
+            # Called from the analysis thread
+            loop.call_soon_threadsafe(analysis.publish, "progress", progress)
+        
+        async def run_analysis():
+            try:
+                response = await _analyze_and_save(file_id, file_path, file_type, detections_format, on_progress)
+                logger.info(f"Streamed analysis of {file_id} saved as {response.result_id}")
+                analysis.publish("result", jsonable_encoder(response))
+            except Exception as e:
+                logger.error(f"Streamed analysis of {file_id} failed: {e}")
+                analysis.publish("error", {"detail": f"Analysis failed: {str(e)}"})
+            finally:
+                # Clean up the original file once the analysis is done, whether or not anyone listens
+                await file_handler.cleanup_file(file_path)
+                _streamed_analyses.pop(file_id, None)
+        
+        # Runs independently of the connection that started it
+        analysis.task = asyncio.create_task(run_analysis())
+    
+    events = analysis.subscribe()
+    
+    async def event_stream():
+        try:
+            yield f"event: started\ndata: {json.dumps({'file_id': file_id, 'analysis_type': analysis.file_type})}\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in ("result", "error"):
+                    break
+        finally:
+            analysis.subscribers.remove(events)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _run_job(job: Dict[str, Any], progress_callback: Callable[[Dict[str, Any]], None]) -> str:
+    """Job queue handler: analyze a queued upload and return the result id"""
+    if not os.path.exists(job["file_path"]):
+        raise RuntimeError("Uploaded file no longer exists")
+    
+    try:
+        response = await _analyze_and_save(job["file_id"], job["file_path"], job["file_type"],
+                                           job["options"].get("detections_format", "records"), progress_callback)
+    except Exception:
+        await file_handler.cleanup_file(job["file_path"])
+        raise
+    
+    await file_handler.cleanup_file(job["file_path"])
+    return response.result_id
+
+# Jobs persist in SQLite, so queued and interrupted analyses resume after a restart
+job_queue = JobQueue(_run_job, db_path="static/jobs.db", workers=int(os.getenv("SPERM_JOB_WORKERS", "2")))
+
+@app.post("/api/analyze/{file_id}/jobs", response_model=JobStatus, status_code=202)
+async def submit_analysis_job(file_id: str, detections_format: Literal["records", "columnar"] = "records"):
+    """
+    Queue an uploaded file for analysis and return the job immediately
+    
+    Poll GET /api/jobs/{job_id} until the state is "completed" (the result
+    is then available under result_id) or "failed".
+    """
+    file_path, file_type = _resolve_upload(file_id)
+    return job_queue.submit(file_id, file_path, file_type, {"detections_format": detections_format})
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """
+    Get the state, progress and result id of an analysis job
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/api/results/{result_id}", response_model=AnalysisResult)
 async def get_results(result_id: str):
     """
@@ -1,19 +1,34 @@
 import json
 import os
 import uuid
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import seaborn as sns
 import numpy as np
-import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import logging
 import asyncio
 
+from models.kinematics import SUMMARY_FORMAT, classify_movement, track_kinematics
+from models.track_store import TrackStore
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# matplotlib and seaborn take about a second to import; they load with the first chart
+_plt = None
+
+def _pyplot():
+    """Import matplotlib.pyplot and apply the chart style on first use"""
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
+        # Configure matplotlib for better charts
+        plt.style.use('seaborn-v0_8')
+        sns.set_palette("husl")
+        _plt = plt
+    return _plt
+
 class DataProcessor:
     def __init__(self):
         self.results_dir = "static/results"
@@ -26,10 +41,6 @@ class DataProcessor:
         
         # Initialize data storage
         self._init_data_storage()
-        
-        # Configure matplotlib for better charts
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
     
     def _init_data_storage(self):
         """Initialize the data storage file if it doesn't exist"""
@@ -67,9 +78,15 @@ class DataProcessor:
         stats = results.get("statistics", {})
         detections = results.get("detections", [])
         
+        # Detections arrive as a list of dicts or, in columnar format, as a dict of lists
+        if isinstance(detections, dict):
+            characteristics = detections.get("characteristics", [])
+        else:
+            characteristics = [d["characteristics"] for d in detections]
+        
         # Calculate enhanced metrics
-        quality_scores = [d["characteristics"]["quality_score"] for d in detections]
-        morphologies = [d["characteristics"]["morphology"] for d in detections]
+        quality_scores = [c["quality_score"] for c in characteristics]
+        morphologies = [c["morphology"] for c in characteristics]
         
         processed = {
             "sperm_count": results.get("total_sperm_count", 0),
@@ -79,7 +96,7 @@ class DataProcessor:
             "quality_distribution": self._calculate_quality_distribution(quality_scores),
             "morphology_summary": self._calculate_morphology_summary(morphologies),
             "viability_assessment": self._assess_viability(stats),
-            "clinical_interpretation": self._generate_clinical_interpretation(stats, len(detections))
+            "clinical_interpretation": self._generate_clinical_interpretation(stats, len(characteristics))
         }
         
         return processed
@@ -172,26 +189,21 @@ class DataProcessor:
     
     def _analyze_movement_patterns(self, tracks: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze sperm movement patterns"""
-        if not tracks:
-            return {"linear_swimmers": 0, "circular_swimmers": 0, "erratic_swimmers": 0}
-        
-        linear_count = 0
-        circular_count = 0
-        erratic_count = 0
-        
-        for track_id, track in tracks.items():
-            positions = track.get("positions", [])
-            if len(positions) < 3:
-                continue
-            
-            # Analyze movement pattern
-            pattern = self._classify_movement_pattern(positions)
-            if pattern == "linear":
-                linear_count += 1
-            elif pattern == "circular":
-                circular_count += 1
-            else:
-                erratic_count += 1
+        if tracks and tracks.get("format") == SUMMARY_FORMAT:
+            # Streaming results carry the pattern counts instead of track points
+            pattern_counts = tracks.get("movement_patterns", {})
+            linear_count = pattern_counts.get("linear", 0)
+            circular_count = pattern_counts.get("circular", 0)
+            erratic_count = pattern_counts.get("erratic", 0)
+        else:
+            store = TrackStore.from_dict(tracks) if tracks else None
+            if store is None or len(store) == 0:
+                return {"linear_swimmers": 0, "circular_swimmers": 0, "erratic_swimmers": 0}
+            
+            patterns = classify_movement(track_kinematics(store))
+            linear_count = int((patterns == "linear").sum())
+            circular_count = int((patterns == "circular").sum())
+            erratic_count = int((patterns == "erratic").sum())
         
         total = linear_count + circular_count + erratic_count
         return {
@@ -202,46 +214,25 @@ class DataProcessor:
             "total_tracked": total
         }
     
-    def _classify_movement_pattern(self, positions: List[List[float]]) -> str:
-        """Classify individual sperm movement pattern"""
-        if len(positions) < 3:
-            return "erratic"
-        
-        # Calculate displacement vectors
-        displacements = []
-        for i in range(1, len(positions)):
-            dx = positions[i][0] - positions[i-1][0]
-            dy = positions[i][1] - positions[i-1][1]
-            displacements.append([dx, dy])
-        
-        # Calculate path straightness
-        total_displacement = np.sqrt(
-            (positions[-1][0] - positions[0][0])**2 + 
-            (positions[-1][1] - positions[0][1])**2
-        )
-        
-        path_length = sum(np.sqrt(d[0]**2 + d[1]**2) for d in displacements)
-        
-        if path_length > 0:
-            straightness = total_displacement / path_length
-            if straightness > 0.7:
-                return "linear"
-            elif straightness > 0.3:
-                return "circular"
-        
-        return "erratic"
-    
     def _analyze_temporal_patterns(self, time_series: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze temporal patterns in sperm count"""
         timestamps = time_series.get("timestamps", [])
         counts = time_series.get("sperm_counts", [])
         
-        if len(counts) < 2:
+        # Streaming results bin the series and carry per-frame running statistics
+        count_statistics = time_series.get("count_statistics")
+        frame_count = count_statistics["frames"] if count_statistics else len(counts)
+        
+        if frame_count < 2:
             return {"stability": "insufficient_data", "trend": "unknown"}
         
         # Calculate stability metrics
-        mean_count = np.mean(counts)
-        std_count = np.std(counts)
+        if count_statistics:
+            mean_count = count_statistics["mean"]
+            std_count = count_statistics["std"]
+        else:
+            mean_count = np.mean(counts)
+            std_count = np.std(counts)
         cv = (std_count / mean_count) * 100 if mean_count > 0 else 0
         
         # Determine stability
@@ -253,8 +244,11 @@ class DataProcessor:
             stability = "low"
         
         # Calculate trend
-        if len(counts) > 5:
-            trend_slope = np.polyfit(range(len(counts)), counts, 1)[0]
+        if frame_count > 5:
+            if count_statistics:
+                trend_slope = count_statistics["trend_slope"]
+            else:
+                trend_slope = np.polyfit(range(len(counts)), counts, 1)[0]
             if trend_slope > 0.5:
                 trend = "increasing"
             elif trend_slope < -0.5:
@@ -269,8 +263,8 @@ class DataProcessor:
             "coefficient_of_variation": float(cv),
             "stability": stability,
             "trend": trend,
-            "max_count": int(max(counts)) if counts else 0,
-            "min_count": int(min(counts)) if counts else 0
+            "max_count": count_statistics["max"] if count_statistics else (int(max(counts)) if counts else 0),
+            "min_count": count_statistics["min"] if count_statistics else (int(min(counts)) if counts else 0)
         }
     
     def _classify_motility(self, motility_stats: Dict[str, Any]) -> str:
@@ -357,6 +351,7 @@ class DataProcessor:
     
     async def _generate_image_charts(self, results: Dict[str, Any], chart_id: str) -> Dict[str, str]:
         """Generate charts for image analysis results"""
+        plt = _pyplot()
         charts = {}
         
         # 1. Quality Distribution Pie Chart
@@ -414,6 +409,7 @@ class DataProcessor:
     
     async def _generate_video_charts(self, results: Dict[str, Any], chart_id: str) -> Dict[str, str]:
         """Generate charts for video analysis results"""
+        plt = _pyplot()
         charts = {}
         
         # 1. Sperm Count Over Time (Line Chart)
@@ -0,0 +1,153 @@
+import fcntl
+import importlib.util
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Backend name -> (ultralytics export format, runtime package it needs)
+INFERENCE_BACKENDS: Dict[str, Dict[str, Optional[str]]] = {
+    "pytorch": {"export_format": None, "runtime": None},
+    "onnx": {"export_format": "onnx", "runtime": "onnxruntime"},
+    "openvino": {"export_format": "openvino", "runtime": "openvino"},
+    "onnx-int8": {"export_format": "onnx", "runtime": "onnxruntime"},
+}
+
+EXPORT_IMAGE_SIZE = 640
+
+def export_artifact_path(weights_path: str, backend: str) -> str:
+    """Location of the exported model, next to the PyTorch weights"""
+    stem, _ = os.path.splitext(weights_path)
+    if backend in ("onnx", "onnx-int8"):
+        return f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_openvino_model"
+    return weights_path
+
+def backend_available(backend: str) -> bool:
+    """Check that the runtime package for ``backend`` is installed"""
+    runtime = INFERENCE_BACKENDS[backend]["runtime"]
+    return runtime is None or importlib.util.find_spec(runtime) is not None
+
+def _artifact_is_stale(artifact_path: str, weights_path: str) -> bool:
+    """An export must be rebuilt when missing or older than the weights it came from"""
+    if not os.path.exists(artifact_path):
+        return True
+    return os.path.getmtime(artifact_path) < os.path.getmtime(weights_path)
+
+@contextmanager
+def artifact_lock(artifact_path: str) -> Iterator[None]:
+    """Exclusive lock on building ``artifact_path``, shared by every process on this host"""
+    with open(f"{artifact_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def replace_artifact(staged_path: str, artifact_path: str):
+    """Move a finished artifact (file or directory) into place, replacing an older one"""
+    if os.path.isdir(artifact_path):
+        # os.replace cannot overwrite a non-empty directory; swap the old one out first
+        retired_path = f"{artifact_path}.old-{os.getpid()}"
+        os.replace(artifact_path, retired_path)
+        os.replace(staged_path, artifact_path)
+        shutil.rmtree(retired_path, ignore_errors=True)
+    else:
+        os.replace(staged_path, artifact_path)
+
+def export_model(weights_path: str, backend: str, **export_kwargs) -> str:
+    """Export ``weights_path`` for ``backend`` unless an up-to-date export is cached.
+
+    Concurrent processes (inference workers, API workers) serialize on a file
+    lock; the export is written into a staging directory and moved into place
+    when complete, so nobody loads a half-written artifact.
+    """
+    export_format = INFERENCE_BACKENDS[backend]["export_format"]
+    artifact_path = export_artifact_path(weights_path, backend)
+
+    if export_format is None or not _artifact_is_stale(artifact_path, weights_path):
+        return artifact_path
+
+    with artifact_lock(artifact_path):
+        # Another process may have finished the export while this one waited
+        if not _artifact_is_stale(artifact_path, weights_path):
+            return artifact_path
+
+        logger.info(f"Exporting {weights_path} to {backend} ({artifact_path})")
+        options = {
+            "format": export_format,
+            "imgsz": EXPORT_IMAGE_SIZE,
+            "dynamic": True,  # Batched video inference feeds a variable batch dimension
+        }
+        options.update(export_kwargs)
+        from ultralytics import YOLO
+
+        # Exporters write next to their weights, so export a copy inside the staging directory
+        staging_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(os.path.abspath(artifact_path)))
+        try:
+            staged_weights = os.path.join(staging_dir, os.path.basename(weights_path))
+            shutil.copy2(weights_path, staged_weights)
+            exported_path = YOLO(staged_weights).export(**options)
+            replace_artifact(str(exported_path), artifact_path)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return artifact_path
+
+def prepare_detector(weights_path: str, backend: str) -> Optional[str]:
+    """Export the model for ``backend`` ahead of loading it, e.g. once before starting worker processes"""
+    if backend not in INFERENCE_BACKENDS or not backend_available(backend) or not os.path.exists(weights_path):
+        return None
+    return export_model(weights_path, backend)
+
+def load_detector(weights_path: str, backend: str = "pytorch", build_int8: bool = False,
+                  synthetic_sampler: Optional[Callable] = None) -> Tuple[Any, str]:
+    """Load the sperm detector for ``backend``, exporting and caching it on first use.
+
+    Every backend is wrapped in an ultralytics ``YOLO`` object, so predictions
+    come back as the same ``Results``/``Boxes`` structures the pipeline reads.
+    Falls back to PyTorch when the requested runtime is not installed.
+    The INT8 model is only calibrated when ``build_int8`` is set (offline, by
+    ``python -m models.quantization``); otherwise a missing or stale INT8 model
+    also falls back to PyTorch. ``synthetic_sampler`` tops up INT8 calibration
+    data when the validation set is empty. Returns the model and the backend
+    actually in use.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {list(INFERENCE_BACKENDS)}")
+
+    # ultralytics (and torch with it) is imported only when a model is loaded
+    from ultralytics import YOLO
+    
+    if not backend_available(backend):
+        logger.warning(f"{INFERENCE_BACKENDS[backend]['runtime']} is not installed; "
+                       f"falling back to the pytorch backend")
+        backend = "pytorch"
+
+    if backend == "onnx-int8" and not build_int8:
+        from models.quantization import int8_artifact_path, int8_model_is_current
+        fp32_path = export_model(weights_path, backend)
+        if int8_model_is_current(weights_path, fp32_path):
+            logger.info(f"Loading {backend} model from {int8_artifact_path(weights_path)}")
+            return YOLO(int8_artifact_path(weights_path), task="detect"), backend
+        logger.warning(f"No up-to-date INT8 model at {int8_artifact_path(weights_path)}; build it with "
+                       f"'python -m models.quantization'. Falling back to the pytorch backend")
+        backend = "pytorch"
+
+    if backend == "pytorch":
+        return YOLO(weights_path), backend
+
+    artifact_path = export_model(weights_path, backend)
+    if backend == "onnx-int8":
+        from models.quantization import build_int8_model
+        artifact_path = build_int8_model(weights_path, artifact_path, synthetic_sampler=synthetic_sampler)
+
+    logger.info(f"Loading {backend} model from {artifact_path}")
+    return YOLO(artifact_path, task="detect"), backend
@@ -0,0 +1,116 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+class InferenceExecutor:
+    """Run blocking analysis work off the event loop with bounded concurrency"""
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None,
+                 max_concurrent: Optional[int] = None,
+                 initializer: Optional[Callable] = None, initargs: Tuple = ()):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of {EXECUTOR_KINDS}")
+
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        # Analyses admitted at once; extra requests wait without holding a worker
+        self.max_concurrent = max_concurrent or self.max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._pool: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.active_jobs = 0
+        self.waiting_jobs = 0
+
+    def start(self):
+        """Create the underlying worker pool"""
+        if self._pool is not None:
+            return
+
+        if self.kind == "process":
+            # Spawn rather than fork so workers never inherit torch/OpenCV thread state
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=self.initializer,
+                initargs=self.initargs
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+                initializer=self.initializer,
+                initargs=self.initargs
+            )
+
+        logger.info(f"Inference executor started: {self.kind} pool with {self.max_workers} workers, "
+                    f"{self.max_concurrent} concurrent analyses")
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run ``func(*args, **kwargs)`` on the pool once a concurrency slot is free"""
+        if self._pool is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        async with self._slot():
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+
+    async def run_in_thread(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a coordinating ``func`` on a plain thread under the same concurrency limit.
+
+        Used for work that fans out to the pool itself via :meth:`submit`.
+        """
+        if self._pool is None:
+            self.start()
+
+        async with self._slot():
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Submit ``func`` to the pool directly, bypassing the analysis semaphore"""
+        if self._pool is None:
+            self.start()
+        return self._pool.submit(func, *args, **kwargs)
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the ``max_concurrent`` analysis slots"""
+        self.waiting_jobs += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting_jobs -= 1
+
+        self.active_jobs += 1
+        try:
+            yield
+        finally:
+            self.active_jobs -= 1
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return current pool utilisation"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_concurrent": self.max_concurrent,
+            "active_jobs": self.active_jobs,
+            "waiting_jobs": self.waiting_jobs
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Shut the worker pool down"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+class KeyframePropagator:
+    """Carry keyframe detections to the following frames with pyramidal Lucas-Kanade flow.
+
+    Each keyframe box is seeded with up to ``points_per_box`` corner features
+    found inside it (its center when the box has no texture), since a box
+    center often sits on plain background where flow has nothing to follow.
+    Points are tracked frame to frame with ``cv2.calcOpticalFlowPyrLK`` and
+    checked with a backward pass; points whose forward-backward error exceeds
+    ``max_flow_error`` pixels are dropped. A box moves with the mean
+    displacement of its surviving points, keeps its keyframe size, and is
+    lost once none of its points survive. A new keyframe is due after
+    ``keyframe_interval`` propagated frames, or as soon as fewer than
+    ``min_tracked_fraction`` of the keyframe's boxes are still tracked.
+    """
+
+    def __init__(self, keyframe_interval: int = 6, min_tracked_fraction: float = 0.7,
+                 max_flow_error: float = 1.0, window_size: int = 21, pyramid_levels: int = 3,
+                 points_per_box: int = 8):
+        self.keyframe_interval = keyframe_interval
+        self.min_tracked_fraction = min_tracked_fraction
+        self.max_flow_error = max_flow_error
+        self.points_per_box = points_per_box
+        self.lk_params = dict(
+            winSize=(window_size, window_size),
+            maxLevel=pyramid_levels,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+
+        self.keyframes = 0
+        self.propagated_frames = 0
+        self.redetections = 0
+
+        self._gray: Optional[np.ndarray] = None
+        self._points = np.zeros((0, 1, 2), dtype=np.float32)
+        self._point_boxes = np.zeros(0, dtype=np.int64)  # Box index of every point
+        self._centers = np.zeros((0, 2), dtype=np.float32)
+        self._box_sizes = np.zeros((0, 2), dtype=np.float32)
+        self._confidences = np.zeros(0, dtype=np.float32)
+        self._keyframe_count = 0
+        self._frames_since_keyframe = 0
+
+    @staticmethod
+    def to_gray(frame: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def needs_keyframe(self) -> bool:
+        """Whether the next frame must be detected instead of propagated"""
+        return self._gray is None or self._frames_since_keyframe >= self.keyframe_interval
+
+    def _seed_points(self, gray: np.ndarray, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Corner features inside every box, as ``(M, 1, 2)`` points and their box indices"""
+        height, width = gray.shape[:2]
+        clipped = np.clip(np.round(boxes), 0, [width, height, width, height]).astype(int)
+        points, point_boxes = [], []
+        for index, (x1, y1, x2, y2) in enumerate(clipped):
+            corners = None
+            if x2 - x1 >= 3 and y2 - y1 >= 3:
+                corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.points_per_box,
+                                                  qualityLevel=0.05, minDistance=2)
+            if corners is None:
+                corners = ((boxes[index, 2:] - boxes[index, :2]) / 2).reshape(1, 1, 2)
+                corners += boxes[index, :2] - [x1, y1]
+            points.append(corners.reshape(-1, 1, 2) + np.array([x1, y1], dtype=np.float32))
+            point_boxes.append(np.full(len(corners), index))
+
+        if not points:
+            return np.zeros((0, 1, 2), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        return np.concatenate(points).astype(np.float32), np.concatenate(point_boxes)
+
+    def set_keyframe(self, gray: np.ndarray, boxes: np.ndarray, confidences: np.ndarray):
+        """Start propagating from freshly detected ``xyxy`` boxes"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self._gray = gray
+        self._points, self._point_boxes = self._seed_points(gray, boxes)
+        self._centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        self._box_sizes = boxes[:, 2:] - boxes[:, :2]
+        self._confidences = np.asarray(confidences, dtype=np.float32)
+        self._keyframe_count = len(boxes)
+        self._frames_since_keyframe = 0
+        self.keyframes += 1
+
+    def propagate(self, gray: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Move the current boxes onto ``gray``; ``None`` when flow is too unreliable and a keyframe is needed"""
+        box_count = len(self._centers)
+        if len(self._points):
+            forward, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, self._points, None, **self.lk_params)
+            backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, forward, None, **self.lk_params)
+            error = np.linalg.norm((backward - self._points).reshape(-1, 2), axis=1)
+            tracked = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < self.max_flow_error)
+        else:
+            forward = self._points
+            tracked = np.zeros(0, dtype=bool)
+
+        # Boxes survive while any of their points does, and move with their points' mean displacement
+        point_boxes = self._point_boxes[tracked]
+        shifts = (forward - self._points).reshape(-1, 2)[tracked]
+        survivors = np.bincount(point_boxes, minlength=box_count)
+        kept = survivors > 0
+
+        if self._keyframe_count and kept.sum() < self.min_tracked_fraction * self._keyframe_count:
+            self.redetections += 1
+            return None
+
+        mean_shift = np.stack([
+            np.bincount(point_boxes, weights=shifts[:, axis], minlength=box_count) for axis in (0, 1)
+        ], axis=1) / np.maximum(survivors, 1)[:, None]
+
+        self._gray = gray
+        self._points = forward[tracked]
+        self._point_boxes = np.cumsum(kept)[point_boxes] - 1  # Renumber onto the kept boxes
+        self._centers = (self._centers + mean_shift)[kept].astype(np.float32)
+        self._box_sizes = self._box_sizes[kept]
+        self._confidences = self._confidences[kept]
+        self._frames_since_keyframe += 1
+        self.propagated_frames += 1
+
+        boxes = np.hstack([self._centers - self._box_sizes / 2, self._centers + self._box_sizes / 2])
+        return boxes, self._confidences
@@ -0,0 +1,221 @@
+import numpy as np
+from typing import Any, Dict, Tuple
+
+from models.track_store import TrackStore
+
+# Average path: centered moving average over this many points (CASA convention)
+AVERAGE_PATH_WINDOW = 5
+
+# Movement patterns by linearity (LIN = VSL / VCL)
+LINEAR_MIN_LIN = 0.7
+CIRCULAR_MIN_LIN = 0.3
+MOVEMENT_PATTERNS = ("linear", "circular", "erratic")
+
+# Lateral distance in pixels a point must have from the average path to count for BCF
+CROSSING_TOLERANCE = 0.5
+
+KINEMATIC_PARAMETERS = ("vcl", "vsl", "vap", "alh", "lin", "str", "wob", "bcf")
+
+# sperm_tracks format carrying only TrackSummary aggregates
+SUMMARY_FORMAT = "summary"
+
+def ragged_from_padded(positions: np.ndarray, timestamps: np.ndarray,
+                       lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten ``(T, L, 2)`` padded tracks with per-track ``lengths`` into ragged ``x, y, t, offsets``"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    valid = np.arange(positions.shape[1])[None, :] < lengths[:, None]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return positions[..., 0][valid], positions[..., 1][valid], timestamps[valid], offsets
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+def _moving_average(values: np.ndarray, point_track: np.ndarray, offsets: np.ndarray, window: int) -> np.ndarray:
+    """Centered moving average that never mixes points of different tracks.
+
+    The window shrinks symmetrically near track ends, so the average path
+    starts and ends on the track's first and last points.
+    """
+    index = np.arange(len(values))
+    half = np.minimum(window // 2, np.minimum(index - offsets[point_track], offsets[point_track + 1] - 1 - index))
+    low = index - half
+    high = index + half + 1
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    return (cumulative[high] - cumulative[low]) / (high - low)
+
+def compute_kinematics(x: np.ndarray, y: np.ndarray, timestamps: np.ndarray, offsets: np.ndarray,
+                       window: int = AVERAGE_PATH_WINDOW,
+                       crossing_tolerance: float = CROSSING_TOLERANCE) -> Dict[str, np.ndarray]:
+    """CASA kinematics for every track of a ragged point set.
+
+    Track ``i`` spans points ``offsets[i]:offsets[i + 1]`` in time order.
+    Returns per-track arrays (pixels and seconds): VCL, VSL, VAP, ALH, LIN,
+    STR, WOB and BCF, plus ``point_count``, ``duration``, ``path_length`` and
+    ``displacement``. Tracks that are too short or have no duration get 0.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    track_count = len(offsets) - 1
+    counts = np.diff(offsets)
+    point_track = np.repeat(np.arange(track_count), counts)
+    nonempty = counts > 0
+    first = offsets[:-1][nonempty]
+    last = offsets[1:][nonempty] - 1
+
+    duration = np.zeros(track_count)
+    displacement = np.zeros(track_count)
+    duration[nonempty] = timestamps[last] - timestamps[first]
+    displacement[nonempty] = np.hypot(x[last] - x[first], y[last] - y[first])
+
+    # Steps between consecutive points of the same track
+    same_track = point_track[1:] == point_track[:-1]
+    step_track = point_track[:-1][same_track]
+    steps = np.hypot(np.diff(x), np.diff(y))[same_track]
+    path_length = np.bincount(step_track, weights=steps, minlength=track_count)
+
+    # Average path and its length
+    average_x = _moving_average(x, point_track, offsets, window)
+    average_y = _moving_average(y, point_track, offsets, window)
+    average_steps = np.hypot(np.diff(average_x), np.diff(average_y))[same_track]
+    average_path_length = np.bincount(step_track, weights=average_steps, minlength=track_count)
+
+    # ALH: twice the largest lateral deviation from the average path
+    deviation = np.hypot(x - average_x, y - average_y)
+    alh = np.zeros(track_count)
+    if len(first):
+        alh[nonempty] = 2 * np.maximum.reduceat(deviation, first)
+
+    # BCF: crossings of the curvilinear path over the average path, per second.
+    # Points within crossing_tolerance of the average path are on neither side,
+    # so sub-pixel jitter does not count as beating.
+    direction_x = np.diff(average_x)[same_track]
+    direction_y = np.diff(average_y)[same_track]
+    lateral = _safe_divide(
+        direction_x * (y[:-1] - average_y[:-1])[same_track] - direction_y * (x[:-1] - average_x[:-1])[same_track],
+        np.hypot(direction_x, direction_y)
+    )
+    off_path = np.abs(lateral) > crossing_tolerance
+    side = np.sign(lateral[off_path])
+    side_track = step_track[off_path]
+    crossing = (side[1:] != side[:-1]) & (side_track[1:] == side_track[:-1])
+    crossings = np.bincount(side_track[1:][crossing], minlength=track_count).astype(np.float64)
+
+    vcl = _safe_divide(path_length, duration)
+    vsl = _safe_divide(displacement, duration)
+    vap = _safe_divide(average_path_length, duration)
+
+    return {
+        "point_count": counts,
+        "duration": duration,
+        "path_length": path_length,
+        "displacement": displacement,
+        "vcl": vcl,
+        "vsl": vsl,
+        "vap": vap,
+        "alh": alh,
+        "lin": _safe_divide(displacement, path_length),
+        "str": _safe_divide(displacement, average_path_length),
+        "wob": _safe_divide(average_path_length, path_length),
+        "bcf": _safe_divide(crossings, duration)
+    }
+
+def track_kinematics(store: TrackStore, window: int = AVERAGE_PATH_WINDOW) -> Dict[str, np.ndarray]:
+    """CASA kinematics for every track in a :class:`TrackStore`"""
+    columns, offsets = store.grouped()
+    return compute_kinematics(columns["x"], columns["y"], columns["timestamp"], offsets, window)
+
+def classify_movement(kinematics: Dict[str, np.ndarray], min_points: int = 3) -> np.ndarray:
+    """Movement pattern per track by linearity; tracks shorter than ``min_points`` get ``""``"""
+    lin = kinematics["lin"]
+    patterns = np.select([lin > LINEAR_MIN_LIN, lin > CIRCULAR_MIN_LIN], ["linear", "circular"], "erratic")
+    return np.where(kinematics["point_count"] >= min_points, patterns, "")
+
+class TrackSummary:
+    """Running motility aggregates over tracks, so finished tracks can be dropped.
+
+    Tracks are added in batches of per-track kinematics; only counts and sums
+    are kept. Velocities are curvilinear (VCL) and a track is motile above
+    ``motile_velocity`` pixels per second.
+    """
+
+    def __init__(self, motile_velocity: float = 5.0):
+        self.motile_velocity = motile_velocity
+        self.track_count = 0
+        self.measured_count = 0
+        self.path_length_sum = 0.0
+        self.timed_count = 0
+        self.motile_count = 0
+        self.velocity_sum = 0.0
+        self.velocity_square_sum = 0.0
+        self.parameter_sums = {name: 0.0 for name in KINEMATIC_PARAMETERS}
+        self.pattern_counts = {pattern: 0 for pattern in MOVEMENT_PATTERNS}
+
+    def add(self, kinematics: Dict[str, np.ndarray]):
+        """Fold one batch of per-track kinematics into the aggregates"""
+        measured = kinematics["point_count"] >= 2
+        timed = measured & (kinematics["duration"] > 0)
+        velocities = kinematics["vcl"][timed]
+
+        self.track_count += len(kinematics["point_count"])
+        self.measured_count += int(measured.sum())
+        self.path_length_sum += float(kinematics["path_length"][measured].sum())
+        self.timed_count += int(timed.sum())
+        self.motile_count += int((velocities > self.motile_velocity).sum())
+        self.velocity_sum += float(velocities.sum())
+        self.velocity_square_sum += float((velocities ** 2).sum())
+        for name in KINEMATIC_PARAMETERS:
+            self.parameter_sums[name] += float(kinematics[name][timed].sum())
+
+        patterns = classify_movement(kinematics)
+        for pattern in MOVEMENT_PATTERNS:
+            self.pattern_counts[pattern] += int((patterns == pattern).sum())
+
+    def merge(self, other: "TrackSummary"):
+        """Fold in the aggregates of another summary, e.g. of another video segment"""
+        self.track_count += other.track_count
+        self.measured_count += other.measured_count
+        self.path_length_sum += other.path_length_sum
+        self.timed_count += other.timed_count
+        self.motile_count += other.motile_count
+        self.velocity_sum += other.velocity_sum
+        self.velocity_square_sum += other.velocity_square_sum
+        for name in KINEMATIC_PARAMETERS:
+            self.parameter_sums[name] += other.parameter_sums[name]
+        for pattern in MOVEMENT_PATTERNS:
+            self.pattern_counts[pattern] += other.pattern_counts[pattern]
+
+    def motility_statistics(self) -> Dict[str, Any]:
+        """Motility statistics of every track added so far"""
+        if self.track_count == 0:
+            return {
+                "total_motile_sperm": 0,
+                "motility_percentage": 0.0,
+                "average_velocity": 0.0,
+                "average_path_length": 0.0
+            }
+
+        average_velocity = self.velocity_sum / self.timed_count if self.timed_count else 0.0
+        velocity_variance = self.velocity_square_sum / self.timed_count - average_velocity ** 2 if self.timed_count else 0.0
+        return {
+            "total_sperm": self.track_count,
+            "total_motile_sperm": self.motile_count,
+            "motility_percentage": float(self.motile_count / self.track_count * 100),
+            "average_velocity": float(average_velocity),
+            "average_path_length": float(self.path_length_sum / self.measured_count) if self.measured_count else 0.0,
+            "velocity_std": float(np.sqrt(max(velocity_variance, 0.0))),
+            "kinematics": {
+                name: (total / self.timed_count if self.timed_count else 0.0)
+                for name, total in self.parameter_sums.items()
+            }
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Track summary in place of per-point tracks"""
+        return {
+            "format": SUMMARY_FORMAT,
+            "track_count": self.track_count,
+            "movement_patterns": dict(self.pattern_counts)
+        }
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BatchDetector = Callable[[List[np.ndarray]], List[Tuple[np.ndarray, np.ndarray]]]
+
+class MicroBatcher:
+    """Coalesce single-image detector calls from concurrent analyses into batched model calls.
+
+    Analysis threads block in :meth:`detect` while one dispatcher thread
+    collects their images, up to ``max_batch_size`` of them and for at most
+    ``max_wait_ms`` after the first arrives, runs them through
+    ``detect_batch`` as one model call and hands each caller its own boxes.
+    A lone request waits no longer than ``max_wait_ms``.
+    """
+
+    def __init__(self, detect_batch: BatchDetector, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        self.detect_batch = detect_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._requests: "queue.Queue[Optional[Tuple[np.ndarray, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.images = 0
+
+    def start(self):
+        """Start the dispatcher thread"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+        logger.info(f"Micro-batching started: up to {self.max_batch_size} images per call, "
+                    f"{self.max_wait * 1000:g} ms wait")
+
+    def submit(self, image: np.ndarray) -> Future:
+        """Queue one image; the future resolves to its ``(boxes, confidences)``"""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        self._requests.put((image, future))
+        return future
+
+    def detect(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Detect on one image as part of the next batch"""
+        return self.submit(image).result()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            request = self._requests.get()
+            if request is None:
+                break
+
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Drain requests that are already queued even once the wait is over
+                    request = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[Tuple[np.ndarray, Future]]):
+        batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            results = self.detect_batch([image for image, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.images += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batches run so far and their mean size"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "images": self.images,
+            "mean_batch_size": self.images / self.batches if self.batches else 0.0
+        }
+
+    def stop(self):
+        """Finish the queued requests and stop the dispatcher thread"""
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import os
+import secrets
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from utils.shared_frames import SharedFrameBatch, attach_frame_batch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# In a directory only this user can enter, so other local users cannot reach the socket
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"sperm-model-{os.getuid()}", "model.sock")
+
+def authkey_path(socket_path: str) -> str:
+    """Key file shared by the server and its clients, next to the socket"""
+    return f"{socket_path}.key"
+
+def load_authkey(socket_path: str, create: bool = False) -> bytes:
+    """Connection authkey from SPERM_MODEL_SERVER_AUTHKEY, or else from the key file next to the socket
+
+    With ``create`` a missing key file is generated. The file must belong to
+    this user and be unreadable to others, so nobody else can plant or read it.
+    """
+    key = os.getenv("SPERM_MODEL_SERVER_AUTHKEY")
+    if key:
+        return key.encode()
+
+    path = authkey_path(socket_path)
+    if create and not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+
+    # FileNotFoundError until the server has created the key
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"Model server key {path} must be owned by this user with mode 0600")
+    with open(path) as f:
+        return f.read().strip().encode()
+
+class ModelServer:
+    """Serve one loaded detector to API worker processes over a Unix socket.
+
+    Each connection is handled on its own thread. Requests carry only a
+    :class:`SharedFrameBatch` descriptor; the server maps the frames, runs
+    the analyzer's batched detector and replies with the box arrays. Single
+    images from different workers are coalesced by the analyzer's
+    micro-batcher.
+
+    Messages are pickled, so clients must first pass the ``authkey``
+    challenge; the socket is created with mode 0600 in a directory that is
+    made private when the server creates it.
+    """
+
+    def __init__(self, analyzer: Any, socket_path: str = DEFAULT_SOCKET_PATH, authkey: Optional[bytes] = None):
+        self.analyzer = analyzer
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.requests = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.analyzer.active_backend,
+            "device": self.analyzer.device,
+            "model_version": self.analyzer.model_version,
+            "requests": self.requests
+        }
+
+    def serve_forever(self):
+        socket_dir = os.path.dirname(os.path.abspath(self.socket_path))
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        if self.authkey is None:
+            self.authkey = load_authkey(self.socket_path, create=True)
+
+        # A socket file left behind by a crashed server would make bind() fail
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        # Bind with a umask that leaves the socket accessible to this user only
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+        finally:
+            os.umask(umask)
+
+        with listener:
+            logger.info(f"Model server listening on {self.socket_path} "
+                        f"({self.analyzer.active_backend} backend on {self.analyzer.device})")
+            while True:
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, EOFError, OSError) as e:
+                    logger.warning(f"Rejected model server connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection: Connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+
+                command = request[0]
+                try:
+                    if command == "detect":
+                        reply = ("ok", self._detect(request[1]))
+                    elif command == "info":
+                        reply = ("ok", self.info())
+                    else:
+                        reply = ("error", f"Unknown command '{command}'")
+                except Exception as e:
+                    logger.error(f"Model server request failed: {e}")
+                    reply = ("error", str(e))
+                connection.send(reply)
+
+    def _detect(self, descriptor) -> List[Tuple[np.ndarray, np.ndarray]]:
+        self.requests += 1
+        shm, frames = attach_frame_batch(descriptor)
+        try:
+            if len(frames) == 1 and self.analyzer.micro_batcher is not None:
+                return [self.analyzer.micro_batcher.detect(frames[0])]
+            return self.analyzer._detect_boxes_batch(list(frames))
+        finally:
+            del frames
+            shm.close()
+
+class ModelClient:
+    """Forward detector calls to a :class:`ModelServer`.
+
+    Thread-safe: every calling thread keeps its own connection. Frames travel
+    through shared memory; only descriptors and box arrays cross the socket.
+    The ``authkey`` defaults to the server's, see :func:`load_authkey`.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, authkey: Optional[bytes] = None):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def connect(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """Wait up to ``timeout`` seconds for the server and return its info"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._call("info")
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(f"Model server at {self.socket_path} is not reachable")
+                time.sleep(0.5)
+
+    def _connection(self) -> Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.authkey is None:
+                self.authkey = load_authkey(self.socket_path)
+            connection = Client(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+            self._local.connection = connection
+        return connection
+
+    def _call(self, *request) -> Any:
+        try:
+            connection = self._connection()
+            connection.send(request)
+            status, payload = connection.recv()
+        except (EOFError, OSError):
+            # Drop the broken connection; the next call reconnects
+            self.close()
+            raise
+        if status != "ok":
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def detect_batch(self, images: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Detect on equally sized images in one server round trip"""
+        shared_batch = SharedFrameBatch(images)
+        try:
+            return self._call("detect", shared_batch.descriptor())
+        finally:
+            shared_batch.release()
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
+
+def main():
+    """Load the detector once and serve it to every API worker on this host"""
+    parser = argparse.ArgumentParser(description="Shared sperm detector server")
+    parser.add_argument("--socket", default=os.getenv("SPERM_MODEL_SERVER") or DEFAULT_SOCKET_PATH,
+                        help="Unix socket path to listen on")
+    args = parser.parse_args()
+
+    from models.micro_batching import MicroBatcher
+    from models.sperm_analyzer import SpermAnalyzer
+
+    analyzer = SpermAnalyzer()
+    asyncio.run(analyzer._load_model())
+    if analyzer.micro_batching:
+        analyzer.micro_batcher = MicroBatcher(
+            analyzer._detect_boxes_batch,
+            max_batch_size=analyzer.micro_batch_size,
+            max_wait_ms=analyzer.micro_batch_wait_ms
+        )
+
+    try:
+        ModelServer(analyzer, args.socket).serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if analyzer.micro_batcher is not None:
+            analyzer.micro_batcher.stop()
+
+if __name__ == "__main__":
+    main()
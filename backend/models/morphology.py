@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+class MorphologyEngine:
+    """Morphology characteristics for every detection from one pass over the image.
+
+    The image is converted to grayscale and thresholded once, connected
+    components and their outer contours are extracted once, and each box is
+    assigned the largest component it overlaps. Only the contours actually
+    chosen by a box are measured.
+    """
+
+    def __init__(self, threshold: int = 0):
+        # 0 selects Otsu's threshold per image
+        self.threshold = threshold
+
+    def analyze(self, image: np.ndarray, boxes_xyxy: np.ndarray) -> List[Dict[str, Any]]:
+        """Return one ``characteristics`` dict per ``xyxy`` box"""
+        if len(boxes_xyxy) == 0:
+            return []
+
+        height, width = image.shape[:2]
+
+        # Integer crop bounds exactly as image[int(y1):int(y2), int(x1):int(x2)] would slice
+        crops = boxes_xyxy.astype(np.int64)
+        crops[:, [0, 2]] = np.clip(crops[:, [0, 2]], 0, width)
+        crops[:, [1, 3]] = np.clip(crops[:, [1, 3]], 0, height)
+        crop_widths = np.maximum(crops[:, 2] - crops[:, 0], 0)
+        crop_heights = np.maximum(crops[:, 3] - crops[:, 1], 0)
+        empty = (crop_widths == 0) | (crop_heights == 0)
+
+        binary = self._binarize(image)
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+        # Bounding-rect overlap of every component (label 0 is background) with every box
+        comp_x1 = stats[1:, cv2.CC_STAT_LEFT]
+        comp_y1 = stats[1:, cv2.CC_STAT_TOP]
+        comp_x2 = comp_x1 + stats[1:, cv2.CC_STAT_WIDTH]
+        comp_y2 = comp_y1 + stats[1:, cv2.CC_STAT_HEIGHT]
+        overlap_w = np.minimum(comp_x2[None, :], crops[:, 2:3]) - np.maximum(comp_x1[None, :], crops[:, 0:1])
+        overlap_h = np.minimum(comp_y2[None, :], crops[:, 3:4]) - np.maximum(comp_y1[None, :], crops[:, 1:2])
+        overlaps = (overlap_w > 0) & (overlap_h > 0)
+
+        # Prefer components that lie mostly inside the box over large ones merely passing through it
+        rect_areas = (stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT])[None, :]
+        mostly_inside = overlaps & (overlap_w * overlap_h * 2 >= rect_areas)
+        candidates = np.where(mostly_inside.any(axis=1, keepdims=True), mostly_inside, overlaps)
+
+        has_component = overlaps.any(axis=1) & ~empty
+        main_labels = np.zeros(len(boxes_xyxy), dtype=np.int64)
+        if overlaps.shape[1]:
+            # Largest candidate component is the main sperm body
+            candidate_areas = np.where(candidates, stats[1:, cv2.CC_STAT_AREA][None, :], -1)
+            main_labels[has_component] = candidate_areas.argmax(axis=1)[has_component] + 1
+
+        areas, perimeters = self._measure_contours(binary, labels, stats, main_labels[has_component])
+        contour_areas = np.zeros(len(boxes_xyxy))
+        contour_perimeters = np.zeros(len(boxes_xyxy))
+        contour_areas[has_component] = areas
+        contour_perimeters[has_component] = perimeters
+
+        aspect_ratios = np.divide(crop_widths, crop_heights, out=np.zeros(len(boxes_xyxy)), where=crop_heights > 0)
+        circularities = np.divide(4 * np.pi * contour_areas, contour_perimeters ** 2,
+                                  out=np.zeros(len(boxes_xyxy)), where=contour_perimeters > 0)
+
+        # Determine morphology classification
+        is_normal = (aspect_ratios > 3) & (circularities < 0.3)
+        is_acceptable = ~is_normal & (aspect_ratios > 2)
+        morphologies = np.select([is_normal, is_acceptable], ["normal", "acceptable"], "abnormal")
+        quality_scores = np.select([is_normal, is_acceptable], [0.8 + (aspect_ratios / 10) * 0.2, 0.6], 0.3)
+
+        morphologies = np.where(has_component, morphologies, "unclear")
+        quality_scores = np.clip(np.where(has_component, quality_scores, 0.4), 0.0, 1.0)
+
+        characteristics = []
+        for i in range(len(boxes_xyxy)):
+            if empty[i]:
+                characteristics.append({"morphology": "unknown", "quality_score": 0.0})
+                continue
+            characteristics.append({
+                "morphology": str(morphologies[i]),
+                "quality_score": float(quality_scores[i]),
+                "aspect_ratio": float(aspect_ratios[i]),
+                "area": float(contour_areas[i]),
+                "circularity": float(circularities[i])
+            })
+        return characteristics
+
+    def _binarize(self, image: np.ndarray) -> np.ndarray:
+        """Grayscale conversion and thresholding for the whole image"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        if self.threshold > 0:
+            _, binary = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        else:
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    def _measure_contours(self, binary: np.ndarray, labels: np.ndarray, stats: np.ndarray,
+                          wanted_labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Contour area and perimeter for each requested component label"""
+        if len(wanted_labels) == 0:
+            return np.zeros(0), np.zeros(0)
+
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # Every outer contour traces exactly one 8-connected component
+        first_points = np.array([contour[0, 0] for contour in contours])
+        contour_labels = labels[first_points[:, 1], first_points[:, 0]]
+        contour_index = dict(zip(contour_labels.tolist(), range(len(contours))))
+
+        measured = {}
+        for label in np.unique(wanted_labels).tolist():
+            if label in contour_index:
+                contour = contours[contour_index[label]]
+            else:
+                # Component nested inside another one's hole: trace it on its own
+                x, y, w, h = stats[label, :4]
+                mask = (labels[y:y + h, x:x + w] == label).astype(np.uint8)
+                component_contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                contour = max(component_contours, key=cv2.contourArea)
+            measured[label] = (cv2.contourArea(contour), cv2.arcLength(contour, True))
+
+        areas = np.array([measured[label][0] for label in wanted_labels.tolist()])
+        perimeters = np.array([measured[label][1] for label in wanted_labels.tolist()])
+        return areas, perimeters
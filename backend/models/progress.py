@@ -0,0 +1,85 @@
+import copy
+import time
+from typing import Any, Callable, Dict, Optional
+
+from models.kinematics import TrackSummary, track_kinematics
+from models.tracking import SpermTracker
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+class ProgressReporter:
+    """Throttled progress updates for one running video analysis.
+
+    ``callback`` receives plain dicts from the analysis thread; it must be
+    thread-safe (e.g. ``loop.call_soon_threadsafe``). Per-frame updates are
+    sent at most every ``min_interval`` seconds, since provisional motility
+    needs the kinematics of every track seen so far.
+    """
+
+    def __init__(self, callback: ProgressCallback, total_frames: int, min_interval: float = 0.5):
+        self.callback = callback
+        self.total_frames = total_frames
+        self.min_interval = min_interval
+        self.started = time.perf_counter()
+        self.frames_processed = 0
+        self._count_sum = 0
+        self._last_sent = 0.0
+
+    def report(self, **fields: Any):
+        """Send an update immediately"""
+        elapsed = time.perf_counter() - self.started
+        self.callback(dict(fields, elapsed_seconds=round(elapsed, 3)))
+
+    def frame(self, frame_result: Dict[str, Any], tracker: SpermTracker,
+              base_summary: Optional[TrackSummary] = None):
+        """Account for one analyzed frame, sending an update when the interval has passed"""
+        self.frames_processed += 1
+        self._count_sum += frame_result["sperm_count"]
+
+        now = time.perf_counter()
+        if now - self._last_sent < self.min_interval:
+            return
+        self._last_sent = now
+
+        # Tracks summarized so far (streaming) plus those still held in the store. Tracks
+        # split off into base_summary keep their store index but no points, so skip them
+        summary = copy.deepcopy(base_summary) if base_summary is not None else TrackSummary()
+        if len(tracker.store):
+            kinematics = track_kinematics(tracker.store)
+            held = kinematics["point_count"] > 0
+            summary.add({name: values[held] for name, values in kinematics.items()})
+        motility = summary.motility_statistics()
+
+        elapsed = now - self.started
+        self.report(
+            frames_processed=self.frames_processed,
+            frame_number=frame_result["frame_number"],
+            total_frames=self.total_frames,
+            progress=min(1.0, (frame_result["frame_number"] + 1) / self.total_frames) if self.total_frames else None,
+            analysis_fps=round(self.frames_processed / elapsed, 2) if elapsed > 0 else 0.0,
+            sperm_count=frame_result["sperm_count"],
+            average_sperm_count=self._count_sum / self.frames_processed,
+            motility={
+                "total_sperm": motility.get("total_sperm", 0),
+                "total_motile_sperm": motility["total_motile_sperm"],
+                "motility_percentage": motility["motility_percentage"],
+                "average_velocity": motility["average_velocity"]
+            }
+        )
+
+class ProgressFrameSink:
+    """Pass frame results through to ``frame_analyses`` while reporting progress"""
+
+    def __init__(self, frame_analyses: Any, reporter: ProgressReporter, tracker: SpermTracker,
+                 base_summary: Optional[TrackSummary] = None):
+        self.frame_analyses = frame_analyses
+        self.reporter = reporter
+        self.tracker = tracker
+        self.base_summary = base_summary
+
+    def __len__(self) -> int:
+        return len(self.frame_analyses)
+
+    def append(self, frame_result: Dict[str, Any]):
+        self.frame_analyses.append(frame_result)
+        self.reporter.frame(frame_result, self.tracker, self.base_summary)
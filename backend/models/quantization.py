@@ -0,0 +1,235 @@
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CALIBRATION_IMAGE_DIR = "data/val/images"
+CALIBRATION_IMAGE_COUNT = 64
+INPUT_SIZE = 640
+
+# Only convolutions and matmuls are quantized; the detection head's concat of
+# pixel-scale boxes with 0-1 class scores stays in float to preserve accuracy
+QUANTIZED_OP_TYPES = ["Conv", "MatMul"]
+
+def int8_artifact_path(weights_path: str) -> str:
+    """Location of the INT8 model, next to the PyTorch weights"""
+    stem, _ = os.path.splitext(weights_path)
+    return f"{stem}_int8.onnx"
+
+def letterbox(image: np.ndarray, size: int = INPUT_SIZE) -> np.ndarray:
+    """Resize keeping aspect ratio and pad to ``size`` x ``size`` like the ultralytics predictor"""
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    return cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+def preprocess(image: np.ndarray, size: int = INPUT_SIZE) -> np.ndarray:
+    """BGR image -> normalised NCHW float32 tensor matching the exported model input"""
+    padded = letterbox(image, size)
+    tensor = padded[:, :, ::-1].transpose(2, 0, 1)  # BGR->RGB, HWC->CHW
+    return np.ascontiguousarray(tensor[np.newaxis], dtype=np.float32) / 255.0
+
+def load_calibration_images(image_dir: str = CALIBRATION_IMAGE_DIR, count: int = CALIBRATION_IMAGE_COUNT,
+                            synthetic_sampler: Optional[Callable[[], Tuple[np.ndarray, Any]]] = None) -> List[np.ndarray]:
+    """Collect calibration images from the validation set, topped up with synthetic samples"""
+    images = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.tif", "*.tiff"):
+        for path in sorted(glob.glob(os.path.join(image_dir, pattern))):
+            if len(images) >= count:
+                break
+            image = cv2.imread(path)
+            if image is not None:
+                images.append(image)
+
+    if len(images) < count and synthetic_sampler is not None:
+        logger.info(f"Using {count - len(images)} synthetic images for calibration")
+        while len(images) < count:
+            image, _ = synthetic_sampler()
+            images.append(image)
+
+    if not images:
+        raise ValueError(f"No calibration images found in {image_dir}")
+
+    return images
+
+def quantize_onnx_model(fp32_path: str, int8_path: str, calibration_images: List[np.ndarray]) -> str:
+    """Statically quantize an ONNX model to INT8 using calibration images"""
+    import onnxruntime
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class _ImageCalibrationReader(CalibrationDataReader):
+        def __init__(self, images: List[np.ndarray]):
+            self._batches = iter([{input_name: preprocess(image)} for image in images])
+
+        def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+            return next(self._batches, None)
+
+    logger.info(f"Quantizing {fp32_path} to INT8 with {len(calibration_images)} calibration images")
+    quantize_static(
+        fp32_path,
+        int8_path,
+        _ImageCalibrationReader(calibration_images),
+        quant_format=QuantFormat.QDQ,
+        op_types_to_quantize=QUANTIZED_OP_TYPES,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=CalibrationMethod.MinMax
+    )
+    return int8_path
+
+def build_int8_model(weights_path: str, fp32_onnx_path: str,
+                     synthetic_sampler: Optional[Callable[[], Tuple[np.ndarray, Any]]] = None) -> str:
+    """Quantize the FP32 ONNX export unless an up-to-date INT8 model is cached
+
+    Built under the artifact lock into a staging file that replaces the
+    model once complete, like the exports in :mod:`models.inference_backends`.
+    """
+    from models.inference_backends import artifact_lock
+
+    int8_path = int8_artifact_path(weights_path)
+    if int8_model_is_current(weights_path, fp32_onnx_path):
+        return int8_path
+
+    with artifact_lock(int8_path):
+        if int8_model_is_current(weights_path, fp32_onnx_path):
+            return int8_path
+
+        calibration_images = load_calibration_images(synthetic_sampler=synthetic_sampler)
+        staged_path = f"{int8_path}.building-{os.getpid()}"
+        try:
+            quantize_onnx_model(fp32_onnx_path, staged_path, calibration_images)
+            os.replace(staged_path, int8_path)
+        finally:
+            if os.path.exists(staged_path):
+                os.remove(staged_path)
+    return int8_path
+
+def int8_model_is_current(weights_path: str, fp32_onnx_path: str) -> bool:
+    """Whether the INT8 model exists and is newer than the FP32 export it was built from"""
+    int8_path = int8_artifact_path(weights_path)
+    return os.path.exists(int8_path) and os.path.getmtime(int8_path) >= os.path.getmtime(fp32_onnx_path)
+
+def _box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of xyxy boxes"""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def _match_detections(reference: np.ndarray, candidate: np.ndarray, iou_threshold: float) -> List[float]:
+    """Greedily match candidate boxes to reference boxes; returns IoUs of the matches"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return []
+
+    iou = _box_iou(reference, candidate)
+    matched_ious = []
+    while True:
+        ref_index, cand_index = np.unravel_index(np.argmax(iou), iou.shape)
+        best = iou[ref_index, cand_index]
+        if best < iou_threshold:
+            break
+        matched_ious.append(float(best))
+        iou[ref_index, :] = -1
+        iou[:, cand_index] = -1
+    return matched_ious
+
+def _timed_boxes(model: Any, image: np.ndarray, conf: float) -> Tuple[np.ndarray, float]:
+    """Run one prediction and return its xyxy boxes with the wall time in ms"""
+    start = time.perf_counter()
+    results = model(image, conf=conf, device="cpu", verbose=False)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    boxes = results[0].boxes
+    xyxy = boxes.xyxy.cpu().numpy() if boxes is not None else np.zeros((0, 4))
+    return xyxy, elapsed_ms
+
+def compare_models(reference_model: Any, candidate_model: Any, images: List[np.ndarray],
+                   conf: float = 0.25, iou_threshold: float = 0.5) -> Dict[str, Any]:
+    """Accuracy-vs-latency report of a candidate model against a reference model"""
+    # Warm both models up so one-off graph initialisation is not timed
+    for model in (reference_model, candidate_model):
+        _timed_boxes(model, images[0], conf)
+
+    reference_times, candidate_times, matched_ious = [], [], []
+    reference_total = candidate_total = 0
+
+    for image in images:
+        reference_boxes, reference_ms = _timed_boxes(reference_model, image, conf)
+        candidate_boxes, candidate_ms = _timed_boxes(candidate_model, image, conf)
+
+        reference_times.append(reference_ms)
+        candidate_times.append(candidate_ms)
+        reference_total += len(reference_boxes)
+        candidate_total += len(candidate_boxes)
+        matched_ious.extend(_match_detections(reference_boxes, candidate_boxes, iou_threshold))
+
+    matched = len(matched_ious)
+    reference_ms = float(np.mean(reference_times))
+    candidate_ms = float(np.mean(candidate_times))
+
+    return {
+        "images": len(images),
+        "reference_detections": reference_total,
+        "candidate_detections": candidate_total,
+        "matched_detections": matched,
+        "recall_vs_reference": matched / reference_total if reference_total else 1.0,
+        "precision_vs_reference": matched / candidate_total if candidate_total else 1.0,
+        "mean_matched_iou": float(np.mean(matched_ious)) if matched_ious else 0.0,
+        "reference_latency_ms": reference_ms,
+        "candidate_latency_ms": candidate_ms,
+        "reference_latency_p95_ms": float(np.percentile(reference_times, 95)),
+        "candidate_latency_p95_ms": float(np.percentile(candidate_times, 95)),
+        "speedup": reference_ms / candidate_ms if candidate_ms > 0 else 0.0
+    }
+
+def main():
+    """Build the INT8 model and print an accuracy-vs-latency report against FP32"""
+    parser = argparse.ArgumentParser(description="INT8 quantization of the sperm detector")
+    parser.add_argument("--weights", default="models/sperm_yolo.pt", help="PyTorch weights to quantize")
+    parser.add_argument("--reference", choices=["pytorch", "onnx"], default="onnx",
+                        help="FP32 model to compare against")
+    parser.add_argument("--images", type=int, default=32, help="Number of images in the report")
+    parser.add_argument("--conf", type=float, default=0.25, help="Detection confidence threshold")
+    parser.add_argument("--output", help="Optional path to write the JSON report")
+    args = parser.parse_args()
+
+    from models.inference_backends import load_detector
+    from models.sperm_analyzer import SpermAnalyzer
+
+    sampler = SpermAnalyzer()._synthetic_sample
+    reference_model, _ = load_detector(args.weights, args.reference)
+    candidate_model, _ = load_detector(args.weights, "onnx-int8", build_int8=True, synthetic_sampler=sampler)
+
+    images = load_calibration_images(count=args.images, synthetic_sampler=sampler)
+    report = compare_models(reference_model, candidate_model, images, conf=args.conf)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
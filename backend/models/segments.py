@@ -0,0 +1,136 @@
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from models.track_store import TrackStore
+
+# Cost for track pairs that cannot be the same sperm
+_UNREACHABLE = 1e9
+
+def plan_segments(total_frames: int, segment_frames: int, overlap_frames: int) -> List[Tuple[int, int, int]]:
+    """Split ``[0, total_frames)`` into ``(start, end, stop)`` segments.
+
+    Each segment owns frames ``[start, end)`` and is analyzed up to ``stop``,
+    ``overlap_frames`` into the next segment, so tracks can be stitched.
+    """
+    segment_frames = max(1, segment_frames)
+    segments = []
+    for start in range(0, max(total_frames, 1), segment_frames):
+        end = min(start + segment_frames, total_frames)
+        segments.append((start, end, min(end + overlap_frames, total_frames)))
+
+    # Fold a short tail into the previous segment
+    if len(segments) > 1 and segments[-1][1] - segments[-1][0] < segment_frames // 2:
+        start, _, _ = segments[-2]
+        segments[-2:] = [(start, total_frames, total_frames)]
+    return segments
+
+def _overlap_paths(store: TrackStore, first_frame: int, last_frame: int) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """Per-track ``(timestamps, positions)`` of the points within ``[first_frame, last_frame)``"""
+    columns, offsets = store.grouped()
+    paths = {}
+    for track in range(len(store)):
+        start, end = offsets[track], offsets[track + 1]
+        frames = columns["frame"][start:end]
+        inside = (frames >= first_frame) & (frames < last_frame)
+        if inside.any():
+            positions = np.column_stack([columns["x"][start:end][inside], columns["y"][start:end][inside]])
+            paths[track] = (columns["timestamp"][start:end][inside], positions.astype(np.float64))
+    return paths
+
+def _path_distance(earlier: Tuple[np.ndarray, np.ndarray], later: Tuple[np.ndarray, np.ndarray]) -> float:
+    """Mean distance between two paths over their common time span"""
+    earlier_times, earlier_positions = earlier
+    later_times, later_positions = later
+    common = (later_times >= earlier_times[0]) & (later_times <= earlier_times[-1])
+    if not common.any():
+        return _UNREACHABLE
+
+    # Samplers of different segments need not pick the same frames: interpolate the earlier path
+    times = later_times[common]
+    x = np.interp(times, earlier_times, earlier_positions[:, 0])
+    y = np.interp(times, earlier_times, earlier_positions[:, 1])
+    return float(np.hypot(x - later_positions[common, 0], y - later_positions[common, 1]).mean())
+
+def match_boundary_tracks(earlier: TrackStore, later: TrackStore, first_frame: int, last_frame: int,
+                          max_distance: float) -> Dict[int, int]:
+    """Pair tracks of two segments that follow the same sperm through the overlap window"""
+    from scipy.optimize import linear_sum_assignment
+    from scipy.spatial import cKDTree
+    
+    earlier_paths = _overlap_paths(earlier, first_frame, last_frame)
+    later_paths = _overlap_paths(later, first_frame, last_frame)
+    if not earlier_paths or not later_paths:
+        return {}
+
+    earlier_ids = list(earlier_paths)
+    later_ids = list(later_paths)
+
+    # Candidates: tracks whose mean overlap positions are close
+    earlier_centers = np.array([earlier_paths[i][1].mean(axis=0) for i in earlier_ids])
+    later_centers = np.array([later_paths[j][1].mean(axis=0) for j in later_ids])
+    candidates = cKDTree(earlier_centers).query_ball_point(later_centers, r=max_distance * 3)
+
+    cost = np.full((len(earlier_ids), len(later_ids)), _UNREACHABLE)
+    for col, rows in enumerate(candidates):
+        for row in rows:
+            distance = _path_distance(earlier_paths[earlier_ids[row]], later_paths[later_ids[col]])
+            if distance < max_distance:
+                cost[row, col] = distance
+
+    rows, cols = linear_sum_assignment(cost)
+    return {
+        earlier_ids[row]: later_ids[col]
+        for row, col in zip(rows.tolist(), cols.tolist())
+        if cost[row, col] < _UNREACHABLE
+    }
+
+def stitch_segments(segment_results: List[Dict[str, Any]], max_distance: float) -> Tuple[TrackStore, List[Dict[str, Any]]]:
+    """Merge per-segment tracks and frame analyses into one result.
+
+    ``segment_results`` are in time order, each with ``start``, ``stop``,
+    ``store`` and ``frame_analyses``. Frames analyzed by two segments are
+    taken from the later one; tracks that match across a boundary continue
+    under one index.
+    """
+    merged = TrackStore()
+    frame_analyses = []
+    previous_global: Dict[int, int] = {}
+
+    for index, segment in enumerate(segment_results):
+        store = segment["store"]
+        next_start = segment_results[index + 1]["start"] if index + 1 < len(segment_results) else None
+
+        current_global: Dict[int, int] = {}
+        if index > 0:
+            previous = segment_results[index - 1]
+            matches = match_boundary_tracks(previous["store"], store, segment["start"], previous["stop"], max_distance)
+            for earlier_track, later_track in matches.items():
+                if earlier_track in previous_global:
+                    current_global[later_track] = previous_global[earlier_track]
+
+        # Points owned by this segment, i.e. before the next segment starts
+        columns, offsets = store.grouped()
+        owned = np.ones(len(columns["frame"]), dtype=bool) if next_start is None else columns["frame"] < next_start
+        point_tracks = np.repeat(np.arange(len(store)), np.diff(offsets))
+
+        for track in np.unique(point_tracks[owned]).tolist():
+            if track not in current_global:
+                first_frame = int(columns["frame"][offsets[track]])
+                current_global[track] = int(merged.new_tracks(1, first_frame)[0])
+
+        kept = owned & np.isin(point_tracks, list(current_global))
+        global_tracks = np.array([current_global[track] for track in point_tracks[kept].tolist()], dtype=np.int64)
+        merged.extend(
+            global_tracks,
+            columns["frame"][kept],
+            np.column_stack([columns["x"][kept], columns["y"][kept]]),
+            columns["timestamp"][kept]
+        )
+
+        frame_analyses.extend(
+            frame for frame in segment["frame_analyses"]
+            if next_start is None or frame["frame_number"] < next_start
+        )
+        previous_global = current_global
+
+    return merged, frame_analyses
@@ -1,160 +1,416 @@
 import cv2
 import numpy as np
-import torch
-from ultralytics import YOLO
+from PIL import Image
 import os
 import asyncio
-from typing import Dict, List, Any, Tuple
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Tuple
 import json
 from datetime import datetime
 import logging
+import shutil
+import time
+import uuid
 from pathlib import Path
 
+from models.inference_backends import load_detector, prepare_detector
+from models.inference_executor import InferenceExecutor
+from models.morphology import MorphologyEngine
+from models.tiling import extract_tiles, merge_tile_detections
+from models.keyframes import KeyframePropagator
+from models.micro_batching import MicroBatcher
+from models.model_server import ModelClient
+from models.kinematics import TrackSummary, track_kinematics
+from models.progress import ProgressCallback, ProgressFrameSink, ProgressReporter
+from models.segments import plan_segments, stitch_segments
+from models.streaming import RunningTimeSeries, StreamingFrameSink
+from models.track_store import TrackStore
+from models.tracking import SpermTracker
+from utils.shared_frames import FrameBatchDescriptor, SharedFrameBatch, attach_frame_batch
+from utils.frame_sampling import FRAME_SAMPLING_MODES, AdaptiveFrameSampler, FixedFrameSampler
+from utils.video_reader import VideoFrameReader
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DETECTION_FORMATS = ("records", "columnar")
+
+# Frame sampling statistics that are counts, summed over video segments
+SAMPLING_COUNTERS = ("frames_probed", "frames_sampled", "keyframes", "propagated_frames", "flow_redetections")
+
+def _default_device() -> str:
+    """CUDA when available; torch is imported here, once a model is loaded"""
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+# Per-process analyzer used by process-pool inference workers
+_worker_analyzer: Optional["SpermAnalyzer"] = None
+
+# Plain-valued analyzer attributes that are state, not settings, and stay out of worker configs
+RUNTIME_ATTRIBUTES = ("initialized", "model_state", "model_source", "model_version", "model_error",
+                      "active_backend", "model", "executor", "micro_batcher", "model_client")
+
+def _process_worker_init(config: Dict[str, Any]):
+    """Load the model once in each inference worker process, configured like the parent analyzer"""
+    global _worker_analyzer
+    _worker_analyzer = SpermAnalyzer()
+    for name, value in config.items():
+        setattr(_worker_analyzer, name, value)
+    asyncio.run(_worker_analyzer._load_model())
+
+def _process_worker_info() -> Dict[str, Any]:
+    """Report the model this inference worker process actually loaded"""
+    return {
+        "pid": os.getpid(),
+        "backend": _worker_analyzer.active_backend,
+        "device": _worker_analyzer.device,
+        "model_source": _worker_analyzer.model_source,
+        "model_version": _worker_analyzer.model_version
+    }
+
+def _process_worker_call(method_name: str, *args) -> Any:
+    """Run a synchronous analyzer method inside an inference worker process"""
+    return getattr(_worker_analyzer, method_name)(*args)
+
+def _process_worker_analyze_frames(descriptor: FrameBatchDescriptor, frame_numbers: List[int],
+                                   fps: float) -> List[Dict[str, Any]]:
+    """Analyze a batch of video frames handed over through shared memory"""
+    shm, frames = attach_frame_batch(descriptor)
+    try:
+        return _worker_analyzer._analyze_frames(list(frames), frame_numbers, fps)
+    finally:
+        del frames
+        shm.close()
+
+def _process_worker_detect_boxes(descriptor: FrameBatchDescriptor) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Detect boxes on a batch of image tiles handed over through shared memory"""
+    shm, tiles = attach_frame_batch(descriptor)
+    try:
+        return _worker_analyzer._detect_boxes_batch(list(tiles))
+    finally:
+        del tiles
+        shm.close()
+
 class SpermAnalyzer:
     def __init__(self):
         self.model = None
         self.model_path = "models/sperm_yolo.pt"
         self.confidence_threshold = 0.25
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.batch_size = 8  # Sampled video frames per model call
+        self.frame_queue_size = 16  # Decoded frames buffered ahead of inference
+        
+        # Video frame sampling: "fixed" analyzes fixed_sampling_fps, "adaptive" samples
+        # whenever the moving sperm travelled about sampling_max_displacement pixels, between
+        # sampling_min_fps and sampling_max_fps, "keyframe" propagates keyframe detections
+        # with optical flow
+        self.frame_sampling = os.getenv("SPERM_FRAME_SAMPLING", "fixed")
+        self.fixed_sampling_fps = 5
+        self.sampling_min_fps = float(os.getenv("SPERM_SAMPLING_MIN_FPS", "2"))
+        self.sampling_max_fps = float(os.getenv("SPERM_SAMPLING_MAX_FPS", "10"))
+        self.sampling_max_displacement = 20.0  # Pixels, well inside track_max_distance
+        
+        # "keyframe" sampling: detect every keyframe_interval + 1 frames (or sooner when
+        # optical flow loses track of the detections) and propagate boxes in between
+        self.keyframe_flow_fps = 25
+        self.keyframe_interval = 5
+        self.keyframe_min_tracked_fraction = 0.7
+        self.keyframe_max_flow_error = 2.0  # Forward-backward flow error in pixels
+        
+        # Tiled inference for large microscope captures: "auto" tiles images whose
+        # longer side reaches tile_min_image_side, "on" always tiles, "off" never does
+        self.tiled_inference = os.getenv("SPERM_TILED_INFERENCE", "auto")
+        self.tile_size = 640
+        self.tile_overlap = 0.2
+        self.tile_min_image_side = 1280
+        self.tile_nms_threshold = 0.5
+        
+        # Tracking: gating radius in pixels, how many sampled frames a sperm may go
+        # undetected before its track stops being matched, and the motion model
+        # ("kalman" predicts positions before association, "static" does not)
+        self.track_max_distance = 50.0
+        self.track_max_missed_samples = 2
+        self.track_motion_model = "kalman"
+        
+        # Long videos with the process executor: analyze segment_seconds time segments in
+        # parallel workers and stitch tracks over segment_overlap_seconds. "auto" segments
+        # videos of at least segment_min_video_seconds, "on" any video longer than a segment
+        self.segmented_video = os.getenv("SPERM_SEGMENTED_VIDEO", "auto")
+        self.segment_seconds = float(os.getenv("SPERM_SEGMENT_SECONDS", "60"))
+        self.segment_overlap_seconds = 1.0
+        self.segment_min_video_seconds = 120
+        
+        # Bounded-memory streaming for long videos: running aggregates instead of per-frame
+        # results and per-point tracks ("auto" streams videos of at least
+        # streaming_min_video_seconds); raw detections optionally spill to a JSON-lines file.
+        # Segmented videos stream segment by segment and merge the aggregates
+        self.streaming_video = os.getenv("SPERM_STREAMING_VIDEO", "auto")
+        self.streaming_min_video_seconds = 600
+        self.streaming_time_series_points = 1000
+        self.detections_spill_dir = os.getenv("SPERM_DETECTIONS_SPILL_DIR")
+        self.progress_interval = 0.5  # Seconds between progress updates of a running video analysis
+        
+        # Morphology for all detections from a single thresholding pass
+        self.morphology_engine = MorphologyEngine()
+        self.device: Optional[str] = None  # cuda when available, resolved when the model loads
         self.initialized = False
         
+        # Startup never trains: without trained weights at model_path, "fallback" serves the
+        # base model and "strict" refuses to start. Readiness follows model_state
+        # (loading, ready or failed) once the model is loaded and warmed up
+        self.startup_mode = os.getenv("SPERM_STARTUP_MODE", "fallback")
+        self.warmup_image_size = 640
+        self.model_state = "loading"
+        self.model_source: Optional[str] = None  # "trained", "fallback" or "server"
+        self.model_version: Optional[str] = None  # Published by python -m models.training
+        self.model_error: Optional[str] = None
+        self._init_lock = asyncio.Lock()
+        
+        # Inference backend: "pytorch", or a CPU runtime exported from the weights
+        # ("onnx", "openvino", or "onnx-int8" for the statically quantized model)
+        self.inference_backend = os.getenv("SPERM_INFERENCE_BACKEND", "pytorch")
+        self.active_backend = "pytorch"
+        
+        # Inference executor: "thread" shares this process' model, "process" loads one per worker
+        self.executor_kind = os.getenv("SPERM_EXECUTOR", "thread")
+        self.executor_workers = int(os.getenv("SPERM_EXECUTOR_WORKERS", "2"))
+        self.max_concurrent_analyses = int(os.getenv("SPERM_MAX_CONCURRENT_ANALYSES", "2"))
+        self.executor: Optional[InferenceExecutor] = None
+        
+        # Thread executor: coalesce the detector calls of concurrent image analyses into
+        # batches of up to micro_batch_size images, waiting at most micro_batch_wait_ms
+        self.micro_batching = os.getenv("SPERM_MICRO_BATCHING", "on") == "on"
+        self.micro_batch_size = int(os.getenv("SPERM_MICRO_BATCH_SIZE", "8"))
+        self.micro_batch_wait_ms = float(os.getenv("SPERM_MICRO_BATCH_WAIT_MS", "5"))
+        self.micro_batcher: Optional[MicroBatcher] = None
+        
+        # Shared model server (python -m models.model_server): when set to its Unix socket
+        # path, detector calls are forwarded there instead of loading weights in this process
+        self.model_server_socket = os.getenv("SPERM_MODEL_SERVER")
+        self.model_server_timeout = 30.0  # Seconds to wait for the server at startup
+        self.model_client: Optional[ModelClient] = None
+        
+        # YOLO predictors are not thread-safe; serialize model calls across executor threads
+        self._model_lock = threading.Lock()
+        
+    def worker_config(self) -> Dict[str, Any]:
+        """Settings of this analyzer, applied to every inference worker process"""
+        return {
+            name: value for name, value in vars(self).items()
+            if name not in RUNTIME_ATTRIBUTES
+            and isinstance(value, (str, int, float, bool, type(None), MorphologyEngine))
+        }
+    
+    def check_model_available(self):
+        """Fail fast in strict startup mode when there are no trained weights to serve"""
+        if self.startup_mode == "strict" and not self.model_server_socket and not os.path.exists(self.model_path):
+            raise RuntimeError(f"No trained model at {self.model_path} (SPERM_STARTUP_MODE=strict)")
+    
     async def initialize_model(self):
-        """Initialize or train the YOLOv8 model for sperm detection"""
-        try:
-            # Check if pre-trained model exists
-            if os.path.exists(self.model_path):
-                logger.info(f"Loading existing model from {self.model_path}")
-                self.model = YOLO(self.model_path)
-            else:
-                logger.info("No pre-trained model found. Training new model...")
-                await self._train_model()
+        """Load and warm up the model and start the inference executor, once"""
+        async with self._init_lock:
+            if self.model_state == "ready":
+                return
             
-            # Move model to appropriate device
-            self.model.to(self.device)
-            self.initialized = True
-            logger.info(f"Model initialized successfully on {self.device}")
+            self.model_state = "loading"
+            started = time.perf_counter()
+            try:
+                await self._initialize_model()
+            except Exception as e:
+                self.model_state = "failed"
+                self.model_error = str(e)
+                raise
             
-        except Exception as e:
-            logger.error(f"Failed to initialize model: {e}")
-            # Fallback to base YOLOv8 and fine-tune for sperm detection
-            await self._create_base_model()
+            self.model_state = "ready"
+            self.model_error = None
+            logger.info(f"Model ready in {time.perf_counter() - started:.1f}s ({self.model_source} model)")
     
-    async def _train_model(self):
-        """Train a YOLOv8 model specifically for sperm detection"""
-        try:
-            # Create training configuration
-            await self._setup_training_data()
-            
-            # Initialize base YOLOv8 model
-            self.model = YOLO('yolov8n.pt')  # Start with nano model for speed
+    def get_readiness(self) -> Dict[str, Any]:
+        """Model state for the readiness probe"""
+        return {
+            "ready": self.model_state == "ready",
+            "state": self.model_state,
+            "model_source": self.model_source,
+            "model_version": self.model_version,
+            "backend": self.active_backend,
+            "device": self.device,
+            "executor": self.executor.kind if self.executor is not None else self.executor_kind,
+            "error": self.model_error
+        }
+    
+    async def _initialize_model(self):
+        if self.model_server_socket:
+            await self._connect_model_server()
+            return
+        
+        if self.executor_kind == "process":
+            # Export once here, so the workers only load the finished artifact
+            await asyncio.to_thread(prepare_detector, self.model_path, self.inference_backend)
             
-            # Train the model
-            results = self.model.train(
-                data='sperm_dataset.yaml',
-                epochs=100,
-                imgsz=640,
-                batch=16,
-                device=self.device,
-                patience=20,
-                save=True,
-                cache=True,
-                workers=4,
-                project='sperm_detection',
-                name='sperm_v1'
+            # Workers load their own model copy; the API process stays light
+            self.executor = InferenceExecutor(
+                kind="process",
+                max_workers=self.executor_workers,
+                max_concurrent=self.max_concurrent_analyses,
+                initializer=_process_worker_init,
+                initargs=(self.worker_config(),)
             )
+            self.executor.start()
             
-            # Save the trained model
-            os.makedirs("models", exist_ok=True)
-            self.model.export(format='pt')
-            
-            logger.info("Model training completed successfully")
+            # Spawn every worker now, so model loading and warmup happen before readiness
+            worker_infos = await asyncio.gather(*[
+                asyncio.wrap_future(self.executor.submit(_process_worker_info)) for _ in range(self.executor_workers)
+            ])
+            logger.info(f"{len({info['pid'] for info in worker_infos})} inference worker processes loaded the model")
             
-        except Exception as e:
-            logger.error(f"Training failed: {e}")
-            await self._create_base_model()
+            # Readiness reports what the workers loaded, not what this process would have
+            info = worker_infos[0]
+            mismatched = [other for other in worker_infos if other["backend"] != info["backend"]
+                          or other["model_source"] != info["model_source"]]
+            if mismatched:
+                logger.warning(f"Inference workers loaded different models: {worker_infos}")
+            self.active_backend = info["backend"]
+            self.device = info["device"]
+            self.model_source = info["model_source"]
+            self.model_version = info["model_version"]
+            self.initialized = True
+            return
+        
+        await self._load_model()
+        self.executor = InferenceExecutor(
+            kind="thread",
+            max_workers=self.executor_workers,
+            max_concurrent=self.max_concurrent_analyses
+        )
+        self.executor.start()
+        
+        if self.micro_batching:
+            self.micro_batcher = MicroBatcher(
+                self._detect_boxes_batch,
+                max_batch_size=self.micro_batch_size,
+                max_wait_ms=self.micro_batch_wait_ms
+            )
+            self.micro_batcher.start()
     
-    async def _setup_training_data(self):
-        """Setup training data for sperm detection"""
-        # Create dataset configuration
-        dataset_config = {
-            'train': 'data/train/images',
-            'val': 'data/val/images',
-            'nc': 1,  # Number of classes (sperm)
-            'names': ['sperm']
-        }
+    async def _connect_model_server(self):
+        """Use the shared model server; this process only decodes, tracks and scores"""
+        if self.executor_kind == "process":
+            logger.warning("SPERM_MODEL_SERVER is set; using the thread executor instead of per-process models")
         
-        # Create directories
-        os.makedirs("data/train/images", exist_ok=True)
-        os.makedirs("data/train/labels", exist_ok=True)
-        os.makedirs("data/val/images", exist_ok=True)
-        os.makedirs("data/val/labels", exist_ok=True)
+        self.model_client = ModelClient(self.model_server_socket)
+        info = await asyncio.to_thread(self.model_client.connect, self.model_server_timeout)
+        self.active_backend = info["backend"]
+        self.device = info["device"]
+        self.model_source = "server"
+        self.model_version = info.get("model_version")
+        logger.info(f"Using model server at {self.model_server_socket} ({self.active_backend} backend on {self.device})")
         
-        # Save dataset configuration
-        with open('sperm_dataset.yaml', 'w') as f:
-            for key, value in dataset_config.items():
-                f.write(f"{key}: {value}\n")
+        self.executor = InferenceExecutor(
+            kind="thread",
+            max_workers=self.executor_workers,
+            max_concurrent=self.max_concurrent_analyses
+        )
+        self.executor.start()
+        self.initialized = True
+    
+    async def _load_model(self):
+        """Load the trained detector, or the base model as a fallback, and warm it up
+        
+        Never trains; models are trained offline and placed at ``model_path``.
+        Blocking steps run on a thread so the event loop keeps serving.
+        """
+        if not os.path.exists(self.model_path):
+            if self.startup_mode == "strict":
+                raise RuntimeError(f"No trained model at {self.model_path} (SPERM_STARTUP_MODE=strict)")
+            logger.warning(f"No trained model at {self.model_path}; serving the base model until one is trained")
+            await self._create_base_model()
+        else:
+            try:
+                logger.info(f"Loading existing model from {self.model_path}")
+                self.model, self.active_backend = await asyncio.to_thread(
+                    load_detector, self.model_path, self.inference_backend
+                )
+                self.model_source = "trained"
+                self.model_version = self._read_model_version()
+            except Exception as e:
+                if self.startup_mode == "strict":
+                    raise
+                logger.error(f"Failed to load model: {e}")
+                await self._create_base_model()
         
-        # Generate synthetic training data if no real data available
-        await self._generate_synthetic_data()
+        # Move model to appropriate device; exported runtimes always run on CPU
+        if self.active_backend == "pytorch":
+            if self.device is None:
+                self.device = _default_device()
+            await asyncio.to_thread(self.model.to, self.device)
+        else:
+            self.device = "cpu"
+        
+        await asyncio.to_thread(self._warmup)
+        self.initialized = True
+        logger.info(f"Model initialized successfully on {self.device} ({self.active_backend} backend)")
+    
+    def _read_model_version(self) -> Optional[str]:
+        """Version recorded next to the weights when the model was published"""
+        metadata_path = f"{os.path.splitext(self.model_path)[0]}.json"
+        try:
+            with open(metadata_path) as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+    
+    def _warmup(self):
+        """Run one dummy inference so the first request does not pay for lazy setup"""
+        started = time.perf_counter()
+        size = self.warmup_image_size
+        self._detect_boxes_batch([np.zeros((size, size, 3), dtype=np.uint8)])
+        logger.info(f"Model warmed up in {time.perf_counter() - started:.2f}s")
     
-    async def _generate_synthetic_data(self):
-        """Generate synthetic sperm-like objects for training if no real data is available"""
-        logger.info("Generating synthetic training data...")
+    def _synthetic_sample(self) -> Tuple[np.ndarray, List[str]]:
+        """Render one synthetic sperm image with its YOLO-format annotations"""
+        # Create synthetic image with sperm-like shapes
+        img = np.zeros((640, 640, 3), dtype=np.uint8)
         
-        for i in range(100):  # Generate 100 synthetic images
-            # Create synthetic image with sperm-like shapes
-            img = np.zeros((640, 640, 3), dtype=np.uint8)
+        # Add background noise
+        noise = np.random.randint(0, 30, (640, 640, 3), dtype=np.uint8)
+        img = cv2.add(img, noise)
+        
+        # Generate random sperm-like objects
+        num_sperm = np.random.randint(5, 20)
+        annotations = []
+        
+        for j in range(num_sperm):
+            # Random position and size
+            x = np.random.randint(50, 590)
+            y = np.random.randint(50, 590)
+            length = np.random.randint(30, 80)
+            width = np.random.randint(8, 15)
             
-            # Add background noise
-            noise = np.random.randint(0, 30, (640, 640, 3), dtype=np.uint8)
-            img = cv2.add(img, noise)
+            # Draw head (ellipse)
+            head_size = np.random.randint(8, 12)
+            cv2.ellipse(img, (x, y), (head_size, head_size//2), 0, 0, 360, (255, 255, 255), -1)
             
-            # Generate random sperm-like objects
-            num_sperm = np.random.randint(5, 20)
-            annotations = []
+            # Draw tail (curved line)
+            tail_points = self._generate_tail_points(x, y, length, width)
+            for k in range(len(tail_points) - 1):
+                cv2.line(img, tail_points[k], tail_points[k+1], (255, 255, 255), 2)
             
-            for j in range(num_sperm):
-                # Random position and size
-                x = np.random.randint(50, 590)
-                y = np.random.randint(50, 590)
-                length = np.random.randint(30, 80)
-                width = np.random.randint(8, 15)
-                
-                # Draw head (ellipse)
-                head_size = np.random.randint(8, 12)
-                cv2.ellipse(img, (x, y), (head_size, head_size//2), 0, 0, 360, (255, 255, 255), -1)
-                
-                # Draw tail (curved line)
-                tail_points = self._generate_tail_points(x, y, length, width)
-                for k in range(len(tail_points) - 1):
-                    cv2.line(img, tail_points[k], tail_points[k+1], (255, 255, 255), 2)
-                
-                # Calculate bounding box for YOLO format
-                x_min = min([p[0] for p in tail_points] + [x - head_size])
-                y_min = min([p[1] for p in tail_points] + [y - head_size])
-                x_max = max([p[0] for p in tail_points] + [x + head_size])
-                y_max = max([p[1] for p in tail_points] + [y + head_size])
-                
-                # Convert to YOLO format (normalized center coordinates)
-                center_x = (x_min + x_max) / 2 / 640
-                center_y = (y_min + y_max) / 2 / 640
-                bbox_width = (x_max - x_min) / 640
-                bbox_height = (y_max - y_min) / 640
-                
-                annotations.append(f"0 {center_x:.6f} {center_y:.6f} {bbox_width:.6f} {bbox_height:.6f}")
+            # Calculate bounding box for YOLO format
+            x_min = min([p[0] for p in tail_points] + [x - head_size])
+            y_min = min([p[1] for p in tail_points] + [y - head_size])
+            x_max = max([p[0] for p in tail_points] + [x + head_size])
+            y_max = max([p[1] for p in tail_points] + [y + head_size])
             
-            # Save image and annotation
-            img_path = f"data/train/images/synthetic_{i:03d}.jpg"
-            label_path = f"data/train/labels/synthetic_{i:03d}.txt"
+            # Convert to YOLO format (normalized center coordinates)
+            center_x = (x_min + x_max) / 2 / 640
+            center_y = (y_min + y_max) / 2 / 640
+            bbox_width = (x_max - x_min) / 640
+            bbox_height = (y_max - y_min) / 640
             
-            cv2.imwrite(img_path, img)
-            with open(label_path, 'w') as f:
-                f.write('\n'.join(annotations))
+            annotations.append(f"0 {center_x:.6f} {center_y:.6f} {bbox_width:.6f} {bbox_height:.6f}")
         
-        logger.info("Synthetic data generation completed")
+        return img, annotations
     
     def _generate_tail_points(self, start_x: int, start_y: int, length: int, width: int) -> List[Tuple[int, int]]:
         """Generate curved tail points for synthetic sperm"""
@@ -173,14 +429,131 @@ class SpermAnalyzer:
     async def _create_base_model(self):
         """Create a basic model as fallback"""
         logger.info("Creating base model for sperm detection")
-        self.model = YOLO('yolov8n.pt')  # Use pre-trained COCO model as base
+        from ultralytics import YOLO
+        self.model = await asyncio.to_thread(YOLO, 'yolov8n.pt')  # Use pre-trained COCO model as base
+        self.active_backend = "pytorch"
+        self.model_source = "fallback"
         self.initialized = True
     
-    async def analyze_image(self, image_path: str) -> Dict[str, Any]:
+    async def analyze_image(self, image_path: str, detections_format: str = "records") -> Dict[str, Any]:
         """Analyze a single image for sperm detection and characteristics"""
-        if not self.initialized:
+        return await self._run_analysis("_analyze_image_sync", image_path, detections_format)
+    
+    async def analyze_video(self, video_path: str, detections_format: str = "records",
+                            progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Analyze video for sperm tracking and motility analysis
+        
+        ``progress_callback`` is called from the analysis thread with progress dicts.
+        """
+        return await self._run_analysis("_analyze_video_sync", video_path, detections_format, progress_callback)
+    
+    async def _run_analysis(self, method_name: str, *args) -> Any:
+        """Dispatch a blocking analysis method to the inference executor"""
+        if self.model_state != "ready":
             await self.initialize_model()
         
+        detections_format = args[1]
+        if detections_format not in DETECTION_FORMATS:
+            raise ValueError(f"Unknown detections format '{detections_format}', expected one of {DETECTION_FORMATS}")
+        
+        if self.executor.kind == "process":
+            if method_name == "_analyze_video_sync" or (
+                method_name == "_analyze_image_sync" and self._image_needs_tiling(args[0])
+            ):
+                # Decode here and fan frame/tile batches out to every worker
+                return await self.executor.run_in_thread(getattr(self, method_name), *args)
+            return await self.executor.run(_process_worker_call, method_name, *args)
+        return await self.executor.run(getattr(self, method_name), *args)
+    
+    def shutdown(self):
+        """Stop the micro-batcher and the inference executor"""
+        if self.micro_batcher is not None:
+            self.micro_batcher.stop()
+            self.micro_batcher = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+    
+    def _predict(self, source: Any) -> Any:
+        """Run the detector on one image or a list of images"""
+        with self._model_lock:
+            return self.model(source, conf=self.confidence_threshold, device=self.device)
+    
+    def _use_tiling(self, width: int, height: int) -> bool:
+        """Whether an image of this size is analyzed as overlapping tiles"""
+        if self.tiled_inference == "on":
+            return True
+        if self.tiled_inference == "auto":
+            return max(width, height) >= self.tile_min_image_side
+        return False
+    
+    def _image_needs_tiling(self, image_path: str) -> bool:
+        """Check tiling from the image header without decoding the pixels"""
+        if self.tiled_inference in ("on", "off"):
+            return self.tiled_inference == "on"
+        try:
+            with Image.open(image_path) as img:
+                width, height = img.size
+        except Exception:
+            return False
+        return self._use_tiling(width, height)
+    
+    def _boxes_to_arrays(self, result: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """Pull all boxes of one model result as ``(N, 4)`` xyxy and ``(N,)`` confidence arrays"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()
+    
+    def _detect_boxes_batch(self, images: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Run one batched model call and return box arrays per image"""
+        if self.model_client is not None:
+            return self.model_client.detect_batch(images)
+        return [self._boxes_to_arrays(result) for result in self._predict(images)]
+    
+    def _detect_boxes(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Detect sperm in a full image, tiling it when it is too large for the model input"""
+        height, width = image.shape[:2]
+        if self._use_tiling(width, height):
+            return self._detect_boxes_tiled(image)
+        if self.micro_batcher is not None:
+            return self.micro_batcher.detect(image)
+        return self._detect_boxes_batch([image])[0]
+    
+    def _detect_boxes_tiled(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Detect on overlapping tiles in batches and merge them with cross-tile NMS"""
+        height, width = image.shape[:2]
+        tiles, offsets = extract_tiles(image, self.tile_size, self.tile_overlap)
+        tile_batches = [tiles[i:i + self.batch_size] for i in range(0, len(tiles), self.batch_size)]
+        
+        tile_detections = []
+        if self._distributes_frames():
+            # Spread tile batches over the process pool through shared memory
+            pending = []
+            try:
+                for tile_batch in tile_batches:
+                    shared_batch = SharedFrameBatch(tile_batch)
+                    pending.append((
+                        self.executor.submit(_process_worker_detect_boxes, shared_batch.descriptor()),
+                        shared_batch
+                    ))
+                for future, _ in pending:
+                    tile_detections.extend(future.result())
+            finally:
+                for _, shared_batch in pending:
+                    shared_batch.release()
+        else:
+            for tile_batch in tile_batches:
+                tile_detections.extend(self._detect_boxes_batch(tile_batch))
+        
+        return merge_tile_detections(
+            [boxes for boxes, _ in tile_detections],
+            [confidences for _, confidences in tile_detections],
+            offsets, width, height, threshold=self.tile_nms_threshold
+        )
+    
+    def _analyze_image_sync(self, image_path: str, detections_format: str = "records") -> Dict[str, Any]:
+        """Blocking image analysis, run on an inference executor worker"""
         try:
             # Load and preprocess image
             image = cv2.imread(image_path)
@@ -189,47 +562,28 @@ class SpermAnalyzer:
             
             original_height, original_width = image.shape[:2]
             
-            # Run inference
-            results = self.model(image, conf=self.confidence_threshold)
+            # Run inference, tiling large microscope captures
+            boxes_xyxy, confidences = self._detect_boxes(image)
             
-            # Process results
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for i, box in enumerate(boxes):
-                        # Extract detection info
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        confidence = float(box.conf[0].cpu().numpy())
-                        
-                        # Calculate sperm characteristics
-                        width = x2 - x1
-                        height = y2 - y1
-                        area = width * height
-                        aspect_ratio = width / height if height > 0 else 0
-                        
-                        # Extract sperm region for detailed analysis
-                        sperm_region = image[int(y1):int(y2), int(x1):int(x2)]
-                        characteristics = self._analyze_sperm_characteristics(sperm_region)
-                        
-                        detection = {
-                            "id": i + 1,
-                            "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                            "confidence": confidence,
-                            "area": float(area),
-                            "aspect_ratio": float(aspect_ratio),
-                            "characteristics": characteristics
-                        }
-                        detections.append(detection)
+            # Box geometry for all detections at once
+            widths = boxes_xyxy[:, 2] - boxes_xyxy[:, 0]
+            heights = boxes_xyxy[:, 3] - boxes_xyxy[:, 1]
+            areas = widths * heights
+            aspect_ratios = np.divide(widths, heights, out=np.zeros_like(widths), where=heights > 0)
+            
+            # Morphology of every detected sperm in one pass over the image
+            characteristics = self.morphology_engine.analyze(image, boxes_xyxy)
             
             # Calculate overall statistics
-            stats = self._calculate_image_statistics(detections, original_width, original_height)
+            stats = self._calculate_image_statistics(characteristics, original_width, original_height)
             
             return {
                 "type": "image_analysis",
                 "image_path": image_path,
-                "total_sperm_count": len(detections),
-                "detections": detections,
+                "total_sperm_count": len(characteristics),
+                "detections": self._format_image_detections(
+                    boxes_xyxy, confidences, areas, aspect_ratios, characteristics, detections_format
+                ),
                 "statistics": stats,
                 "analysis_timestamp": datetime.now().isoformat()
             }
@@ -238,43 +592,36 @@ class SpermAnalyzer:
             logger.error(f"Image analysis failed: {e}")
             raise
     
-    async def analyze_video(self, video_path: str) -> Dict[str, Any]:
-        """Analyze video for sperm tracking and motility analysis"""
-        if not self.initialized:
-            await self.initialize_model()
-        
+    def _analyze_video_sync(self, video_path: str, detections_format: str = "records",
+                            progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Blocking video analysis, run on an inference executor worker"""
         try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise ValueError(f"Could not open video file: {video_path}")
+            reader = VideoFrameReader(video_path, queue_size=self.frame_queue_size)
             
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = reader.fps
+            total_frames = reader.total_frames
             duration = total_frames / fps if fps > 0 else 0
             
-            frame_analyses = []
-            sperm_tracks = {}
-            frame_count = 0
+            progress = None
+            if progress_callback is not None:
+                progress = ProgressReporter(progress_callback, total_frames, min_interval=self.progress_interval)
             
-            # Process every nth frame for efficiency
-            frame_skip = max(1, int(fps // 5))  # Analyze 5 frames per second
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if frame_count % frame_skip == 0:
-                    # Analyze current frame
-                    frame_result = await self._analyze_frame(frame, frame_count, fps)
-                    frame_analyses.append(frame_result)
-                    
-                    # Update sperm tracking
-                    self._update_sperm_tracking(sperm_tracks, frame_result, frame_count)
-                
-                frame_count += 1
+            # Streaming and segmenting combine: each segment streams in its own worker
+            segments = self._plan_video_segments(fps, total_frames)
+            if self._use_streaming(fps, total_frames):
+                if len(segments) > 1:
+                    reader.stop()
+                    return self._analyze_video_streaming_segments(video_path, segments, fps, duration, progress)
+                return self._analyze_video_streaming(video_path, reader, duration, progress)
             
-            cap.release()
+            if len(segments) > 1:
+                reader.stop()
+                sperm_tracks, frame_analyses, sampling_stats = self._analyze_video_segments(video_path, segments, progress)
+            else:
+                segment = self._analyze_video_segment(video_path, reader=reader, progress=progress)
+                sperm_tracks = segment["store"]
+                frame_analyses = segment["frame_analyses"]
+                sampling_stats = segment["sampling_stats"]
             
             # Calculate motility and movement statistics
             motility_stats = self._calculate_motility_statistics(sperm_tracks, fps)
@@ -288,10 +635,13 @@ class SpermAnalyzer:
                 "duration": duration,
                 "total_frames_analyzed": len(frame_analyses),
                 "fps": fps,
-                "sperm_tracks": sperm_tracks,
+                "frame_sampling": sampling_stats,
+                "sperm_tracks": sperm_tracks.to_dict(),
                 "motility_statistics": motility_stats,
                 "time_series": time_series,
-                "frame_analyses": frame_analyses,
+                "frame_analyses": [
+                    self._format_frame_result(frame_result, detections_format) for frame_result in frame_analyses
+                ],
                 "analysis_timestamp": datetime.now().isoformat()
             }
             
@@ -299,92 +649,454 @@ class SpermAnalyzer:
             logger.error(f"Video analysis failed: {e}")
             raise
     
-    async def _analyze_frame(self, frame: np.ndarray, frame_number: int, fps: float) -> Dict[str, Any]:
-        """Analyze a single video frame"""
-        # Run YOLO inference on frame
-        results = self.model(frame, conf=self.confidence_threshold)
-        
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for i, box in enumerate(boxes):
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    
-                    # Calculate center point for tracking
-                    center_x = (x1 + x2) / 2
-                    center_y = (y1 + y2) / 2
-                    
-                    detection = {
-                        "id": i,
-                        "bbox": [float(x1), float(y1), float(x2), float(y2)],
-                        "center": [float(center_x), float(center_y)],
-                        "confidence": confidence,
-                        "frame_number": frame_number,
-                        "timestamp": frame_number / fps
-                    }
-                    detections.append(detection)
+    def _analyze_video_streaming(self, video_path: str, reader: VideoFrameReader, duration: float,
+                                 progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
+        """Video analysis that keeps only running aggregates instead of per-frame and per-point history"""
+        fps = reader.fps
+        spill_path = self._detections_spill_path(video_path)
+        sink, sampling_stats = self._stream_frames(reader, spill_path, progress=progress)
+        return self._streaming_result(video_path, duration, fps, len(sink), sampling_stats,
+                                      sink.track_summary, sink.time_series, spill_path)
+    
+    def _stream_frames(self, reader: VideoFrameReader, spill_path: Optional[str] = None,
+                       head_stop: Optional[int] = None, end_frame: Optional[int] = None,
+                       progress: Optional[ProgressReporter] = None) -> Tuple[StreamingFrameSink, Dict[str, Any]]:
+        """Run the frame loop into a streaming sink, returning the finished sink and the sampling statistics"""
+        sampler = self._create_frame_sampler(reader.fps)
+        tracker = self._create_tracker(sampler, report_closed=True)
+        sink = StreamingFrameSink(tracker, spill_path=spill_path, max_time_series_points=self.streaming_time_series_points,
+                                  head_stop=head_stop, end_frame=end_frame)
+        frame_sink = sink if progress is None else ProgressFrameSink(sink, progress, tracker, sink.track_summary)
+        try:
+            sampling_stats = self._run_frame_loop(reader, sampler, tracker, reader.fps, frame_sink, count_stop=end_frame)
+        finally:
+            sink.finish()
+        return sink, sampling_stats
+    
+    def _analyze_video_segment_streaming(self, video_path: str, start_frame: int, end_frame: int, stop_frame: int,
+                                         head_stop: Optional[int] = None,
+                                         spill_path: Optional[str] = None) -> Dict[str, Any]:
+        """Streaming analysis of one time segment, returning its aggregates and the tracks to stitch"""
+        reader = VideoFrameReader(video_path, queue_size=self.frame_queue_size,
+                                  start_frame=start_frame, stop_frame=stop_frame)
+        sink, sampling_stats = self._stream_frames(reader, spill_path, head_stop=head_stop, end_frame=end_frame)
+        return {
+            "start": start_frame,
+            "stop": stop_frame,
+            "store": sink.boundary_tracks,
+            "frame_analyses": [],
+            "frames": len(sink),
+            "track_summary": sink.track_summary,
+            "time_series": sink.time_series,
+            "sampling_stats": sampling_stats
+        }
+    
+    def _analyze_video_streaming_segments(self, video_path: str, segments: List[Tuple[int, int, int]], fps: float,
+                                          duration: float, progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
+        """Stream time segments in parallel worker processes and merge their aggregates"""
+        logger.info(f"Streaming {video_path} as {len(segments)} parallel segments")
+        spill_path = self._detections_spill_path(video_path)
+        part_paths = [f"{spill_path}.part{index}" if spill_path else None for index in range(len(segments))]
+        try:
+            segment_results = self._run_video_segments([
+                ("_analyze_video_segment_streaming", video_path, start, end, stop,
+                 segments[index - 1][2] if index > 0 else None, part_paths[index])
+                for index, (start, end, stop) in enumerate(segments)
+            ], progress)
+            
+            if spill_path:
+                with open(spill_path, "wb") as spill:
+                    for part_path in part_paths:
+                        with open(part_path, "rb") as part:
+                            shutil.copyfileobj(part, spill)
+        finally:
+            for part_path in part_paths:
+                if part_path and os.path.exists(part_path):
+                    os.remove(part_path)
         
+        # Tracks crossing a segment boundary are stitched first, then summarized like the rest
+        track_summary = TrackSummary()
+        time_series = RunningTimeSeries(self.streaming_time_series_points)
+        for segment in segment_results:
+            track_summary.merge(segment["track_summary"])
+            time_series.merge(segment["time_series"])
+        boundary_tracks, _ = stitch_segments(segment_results, self.track_max_distance)
+        if len(boundary_tracks):
+            track_summary.add(track_kinematics(boundary_tracks))
+        
+        return self._streaming_result(video_path, duration, fps, sum(segment["frames"] for segment in segment_results),
+                                      self._merge_sampling_stats(segment_results), track_summary, time_series, spill_path)
+    
+    def _streaming_result(self, video_path: str, duration: float, fps: float, frames: int,
+                          sampling_stats: Dict[str, Any], track_summary: TrackSummary,
+                          time_series: RunningTimeSeries, spill_path: Optional[str]) -> Dict[str, Any]:
+        """Response of a streaming video analysis"""
         return {
-            "frame_number": frame_number,
-            "timestamp": frame_number / fps,
-            "sperm_count": len(detections),
-            "detections": detections
+            "type": "video_analysis",
+            "video_path": video_path,
+            "duration": duration,
+            "total_frames_analyzed": frames,
+            "fps": fps,
+            "frame_sampling": sampling_stats,
+            "streaming": True,
+            "sperm_tracks": track_summary.to_dict(),
+            "motility_statistics": track_summary.motility_statistics(),
+            "time_series": time_series.to_dict(fps),
+            "frame_analyses": [],
+            "detections_file": spill_path,
+            "analysis_timestamp": datetime.now().isoformat()
         }
     
-    def _analyze_sperm_characteristics(self, sperm_region: np.ndarray) -> Dict[str, Any]:
-        """Analyze individual sperm characteristics from cropped region"""
-        if sperm_region.size == 0:
-            return {"morphology": "unknown", "quality_score": 0.0}
+    def _detections_spill_path(self, video_path: str) -> Optional[str]:
+        """New JSON-lines file for the raw detections of a streaming analysis, if spilling is on"""
+        if not self.detections_spill_dir:
+            return None
+        os.makedirs(self.detections_spill_dir, exist_ok=True)
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.detections_spill_dir, f"{video_name}_{uuid.uuid4().hex[:8]}_detections.jsonl")
+    
+    def _use_streaming(self, fps: float, total_frames: int) -> bool:
+        """Whether a video is analyzed in bounded-memory streaming mode"""
+        if self.streaming_video == "auto":
+            return fps > 0 and total_frames / fps >= self.streaming_min_video_seconds
+        return self.streaming_video == "on"
+    
+    def _create_tracker(self, sampler: Any, report_closed: bool = False) -> SpermTracker:
+        """Tracker whose expiry gap matches the frame sampling"""
+        # Keyframe mode only re-detects lost sperm on keyframes
+        max_interval = sampler.max_interval
+        if self.frame_sampling == "keyframe":
+            max_interval *= self.keyframe_interval + 1
+        
+        return SpermTracker(
+            max_distance=self.track_max_distance,
+            max_gap_frames=max_interval * (self.track_max_missed_samples + 1),
+            motion_model=self.track_motion_model,
+            report_closed=report_closed
+        )
+    
+    def _run_frame_loop(self, reader: VideoFrameReader, sampler: Any, tracker: SpermTracker, fps: float,
+                        frame_analyses: Any, count_stop: Optional[int] = None) -> Dict[str, Any]:
+        """Analyze the video with the configured sampling, returning the sampling statistics
+        
+        Frames from ``count_stop`` on are analyzed but not counted in the statistics.
+        """
+        sampler.count_stop = count_stop
+        if self.frame_sampling == "keyframe":
+            return self._analyze_keyframes(reader, sampler, tracker, fps, frame_analyses, count_stop)
+        self._analyze_sampled_frames(reader, sampler, tracker, fps, frame_analyses)
+        return sampler.get_stats()
+    
+    def _analyze_video_segment(self, video_path: str, start_frame: int = 0, end_frame: Optional[int] = None,
+                               stop_frame: Optional[int] = None, reader: Optional[VideoFrameReader] = None,
+                               progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
+        """Detect and track sperm on the frames ``[start_frame, stop_frame)`` of a video
+        
+        The segment owns the frames before ``end_frame``; only those are counted
+        in the sampling statistics.
+        """
+        if reader is None:
+            reader = VideoFrameReader(video_path, queue_size=self.frame_queue_size,
+                                      start_frame=start_frame, stop_frame=stop_frame)
+        fps = reader.fps
         
-        # Convert to grayscale for analysis
-        gray = cv2.cvtColor(sperm_region, cv2.COLOR_BGR2GRAY)
+        # Process a subset of frames for efficiency
+        sampler = self._create_frame_sampler(fps)
+        tracker = self._create_tracker(sampler)
         
-        # Calculate basic morphology features
-        height, width = gray.shape
-        aspect_ratio = width / height if height > 0 else 0
+        frame_analyses = []
+        frame_sink = frame_analyses if progress is None else ProgressFrameSink(frame_analyses, progress, tracker)
+        sampling_stats = self._run_frame_loop(reader, sampler, tracker, fps, frame_sink, count_stop=end_frame)
         
-        # Analyze shape characteristics
-        contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return {
+            "start": start_frame,
+            "stop": stop_frame,
+            "store": tracker.store,
+            "frame_analyses": frame_analyses,
+            "sampling_stats": sampling_stats
+        }
+    
+    def _plan_video_segments(self, fps: float, total_frames: int) -> List[Tuple[int, int, int]]:
+        """Time segments to analyze in parallel, or a single segment for the whole video"""
+        whole_video = [(0, total_frames, total_frames)]
+        if self.segmented_video not in ("auto", "on") or not self._distributes_frames() or fps <= 0:
+            return whole_video
+        if self.segmented_video == "auto" and total_frames / fps < self.segment_min_video_seconds:
+            return whole_video
+        return plan_segments(
+            total_frames,
+            int(self.segment_seconds * fps),
+            int(self.segment_overlap_seconds * fps)
+        )
+    
+    def _analyze_video_segments(self, video_path: str, segments: List[Tuple[int, int, int]],
+                                progress: Optional[ProgressReporter] = None) -> Tuple[TrackStore, List[Dict], Dict[str, Any]]:
+        """Analyze time segments in parallel worker processes and stitch them together"""
+        logger.info(f"Analyzing {video_path} as {len(segments)} parallel segments")
+        segment_results = self._run_video_segments([
+            ("_analyze_video_segment", video_path, start, end, stop) for start, end, stop in segments
+        ], progress)
+        sperm_tracks, frame_analyses = stitch_segments(segment_results, self.track_max_distance)
+        return sperm_tracks, frame_analyses, self._merge_sampling_stats(segment_results)
+    
+    def _run_video_segments(self, calls: List[Tuple], progress: Optional[ProgressReporter] = None) -> List[Dict[str, Any]]:
+        """Run ``(method_name, *args)`` segment calls on the worker processes, returning results in order"""
+        futures = [self.executor.submit(_process_worker_call, *call) for call in calls]
+        segment_results = []
+        try:
+            for future in futures:
+                segment_results.append(future.result())
+                if progress is not None:
+                    progress.report(
+                        segments_completed=len(segment_results),
+                        segments_total=len(calls),
+                        progress=len(segment_results) / len(calls)
+                    )
+        finally:
+            for future in futures:
+                future.cancel()
+        return segment_results
+    
+    def _merge_sampling_stats(self, segment_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sampling statistics of a segmented analysis"""
+        # Sampler settings are shared; each segment counts only the frames it owns, so counters add up
+        sampling_stats = dict(segment_results[0]["sampling_stats"], segments=len(segment_results))
+        for segment in segment_results[1:]:
+            for key in SAMPLING_COUNTERS:
+                if key in segment["sampling_stats"]:
+                    sampling_stats[key] += segment["sampling_stats"][key]
+        return sampling_stats
+    
+    def _create_frame_sampler(self, fps: float):
+        """Frame sampler for one video according to the sampling settings"""
+        if self.frame_sampling not in FRAME_SAMPLING_MODES:
+            raise ValueError(f"Unknown frame sampling '{self.frame_sampling}', expected one of {FRAME_SAMPLING_MODES}")
+        if self.frame_sampling == "keyframe":
+            # Optical flow needs closely spaced frames: follow the video up to keyframe_flow_fps
+            return FixedFrameSampler(max(1, int(round(fps / self.keyframe_flow_fps))) if fps > 0 else 1)
+        if self.frame_sampling == "adaptive":
+            return AdaptiveFrameSampler(
+                fps,
+                min_fps=self.sampling_min_fps,
+                max_fps=self.sampling_max_fps,
+                max_displacement=self.sampling_max_displacement
+            )
+        return FixedFrameSampler(max(1, int(fps // self.fixed_sampling_fps)))
+    
+    def _analyze_sampled_frames(self, reader: VideoFrameReader, sampler: Any, tracker: SpermTracker,
+                                fps: float, frame_analyses: Any):
+        """Detect on every sampled frame in batches, feeding results and tracking in frame order"""
+        # Sampled frames waiting for the next batched model call
+        batch_frames = []
+        batch_frame_numbers = []
+        
+        # Submitted batches, collected strictly in frame order for tracking
+        pending_batches = deque()
+        max_in_flight = self.executor.max_workers * 2 if self._distributes_frames() else 0
         
-        if contours:
-            # Find largest contour (main sperm body)
-            main_contour = max(contours, key=cv2.contourArea)
-            area = cv2.contourArea(main_contour)
-            perimeter = cv2.arcLength(main_contour, True)
+        try:
+            # Decoding runs on the reader thread while batches are inferred here
+            with reader.start(sampler=sampler):
+                for frame_number, frame in reader:
+                    batch_frames.append(frame)
+                    batch_frame_numbers.append(frame_number)
+                    
+                    if len(batch_frames) >= self.batch_size:
+                        pending_batches.append(
+                            self._submit_frame_batch(batch_frames, batch_frame_numbers, fps)
+                        )
+                        batch_frames = []
+                        batch_frame_numbers = []
+                        
+                        while len(pending_batches) > max_in_flight:
+                            self._collect_frame_batch(pending_batches.popleft(), frame_analyses, tracker)
             
-            # Calculate morphology metrics
-            if perimeter > 0:
-                circularity = 4 * np.pi * area / (perimeter * perimeter)
-            else:
-                circularity = 0
+            # Flush the final partial batch
+            if batch_frames:
+                pending_batches.append(self._submit_frame_batch(batch_frames, batch_frame_numbers, fps))
             
-            # Determine morphology classification
-            if aspect_ratio > 3 and circularity < 0.3:
-                morphology = "normal"
-                quality_score = 0.8 + (aspect_ratio / 10) * 0.2
-            elif aspect_ratio > 2:
-                morphology = "acceptable"
-                quality_score = 0.6
-            else:
-                morphology = "abnormal"
-                quality_score = 0.3
-        else:
-            morphology = "unclear"
-            quality_score = 0.4
+            while pending_batches:
+                self._collect_frame_batch(pending_batches.popleft(), frame_analyses, tracker)
+        finally:
+            # Free shared memory of batches abandoned after an error
+            for _, future, shared_batch in pending_batches:
+                future.cancel()
+                if shared_batch is not None:
+                    shared_batch.release()
+    
+    def _analyze_keyframes(self, reader: VideoFrameReader, sampler: Any, tracker: SpermTracker,
+                           fps: float, frame_analyses: Any, count_stop: Optional[int] = None) -> Dict[str, Any]:
+        """Detect on keyframes only and propagate boxes to the frames in between with optical flow"""
+        propagator = KeyframePropagator(
+            keyframe_interval=self.keyframe_interval,
+            min_tracked_fraction=self.keyframe_min_tracked_fraction,
+            max_flow_error=self.keyframe_max_flow_error
+        )
+        
+        # Propagation counters as of count_stop; later frames belong to the next segment
+        counters = None
+        
+        with reader.start(sampler=sampler):
+            for frame_number, frame in reader:
+                if counters is None and count_stop is not None and frame_number >= count_stop:
+                    counters = (propagator.keyframes, propagator.propagated_frames, propagator.redetections)
+                gray = propagator.to_gray(frame)
+                
+                propagated = None if propagator.needs_keyframe() else propagator.propagate(gray)
+                if propagated is None:
+                    boxes, confidences = self._detect_keyframe(frame)
+                    propagator.set_keyframe(gray, boxes, confidences)
+                    frame_result = self._build_frame_result(boxes, confidences, frame_number, fps)
+                    frame_analyses.append(frame_result)
+                else:
+                    frame_result = self._build_frame_result(*propagated, frame_number, fps)
+                
+                # Dense positions on every frame, detected or propagated
+                self._update_sperm_tracking(tracker, frame_result, frame_number)
+        
+        if counters is None:
+            counters = (propagator.keyframes, propagator.propagated_frames, propagator.redetections)
+        
+        sampling_stats = sampler.get_stats()
+        sampling_stats.update({
+            "mode": "keyframe",
+            "keyframes": counters[0],
+            "propagated_frames": counters[1],
+            "flow_redetections": counters[2]
+        })
+        return sampling_stats
+    
+    def _detect_keyframe(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Detect on one keyframe, in a worker process when inference is distributed"""
+        height, width = frame.shape[:2]
+        if not self._distributes_frames() or self._use_tiling(width, height):
+            return self._detect_boxes(frame)
+        
+        shared_batch = SharedFrameBatch([frame])
+        try:
+            return self.executor.submit(_process_worker_detect_boxes, shared_batch.descriptor()).result()[0]
+        finally:
+            shared_batch.release()
+    
+    def _distributes_frames(self) -> bool:
+        """Whether video frame batches are fanned out to process-pool workers"""
+        return self.executor is not None and self.executor.kind == "process"
+    
+    def _submit_frame_batch(self, frames: List[np.ndarray], frame_numbers: List[int],
+                            fps: float) -> Tuple[List[int], Future, Optional[SharedFrameBatch]]:
+        """Start inference for a batch of sampled frames"""
+        if self._distributes_frames():
+            shared_batch = SharedFrameBatch(frames)
+            future = self.executor.submit(
+                _process_worker_analyze_frames, shared_batch.descriptor(), frame_numbers, fps
+            )
+            return frame_numbers, future, shared_batch
+        
+        future = Future()
+        future.set_result(self._analyze_frames(frames, frame_numbers, fps))
+        return frame_numbers, future, None
+    
+    def _collect_frame_batch(self, pending_batch: Tuple[List[int], Future, Optional[SharedFrameBatch]],
+                             frame_analyses: Any, tracker: SpermTracker):
+        """Wait for a submitted batch and feed its results to tracking in frame order"""
+        frame_numbers, future, shared_batch = pending_batch
+        try:
+            frame_results = future.result()
+        finally:
+            if shared_batch is not None:
+                shared_batch.release()
+        
+        for frame_number, frame_result in zip(frame_numbers, frame_results):
+            frame_analyses.append(frame_result)
+            
+            # Update sperm tracking
+            self._update_sperm_tracking(tracker, frame_result, frame_number)
+    
+    def _analyze_frame(self, frame: np.ndarray, frame_number: int, fps: float) -> Dict[str, Any]:
+        """Analyze a single video frame"""
+        frame_results = self._analyze_frames([frame], [frame_number], fps)
+        return frame_results[0]
+    
+    def _analyze_frames(self, frames: List[np.ndarray], frame_numbers: List[int],
+                        fps: float) -> List[Dict[str, Any]]:
+        """Analyze several video frames with a single batched model call"""
+        # Run YOLO inference on all frames at once; one result per input frame
+        frame_boxes = self._detect_boxes_batch(frames)
+        
+        return [
+            self._build_frame_result(boxes_xyxy, confidences, frame_number, fps)
+            for (boxes_xyxy, confidences), frame_number in zip(frame_boxes, frame_numbers)
+        ]
+    
+    def _build_frame_result(self, boxes_xyxy: np.ndarray, confidences: np.ndarray,
+                            frame_number: int, fps: float) -> Dict[str, Any]:
+        """Per-frame analysis with detections kept as columnar arrays until formatting"""
+        # Calculate center points for tracking
+        centers = (boxes_xyxy[:, :2] + boxes_xyxy[:, 2:]) / 2
         
         return {
-            "morphology": morphology,
-            "quality_score": min(1.0, max(0.0, quality_score)),
-            "aspect_ratio": aspect_ratio,
-            "area": float(area) if 'area' in locals() else 0,
-            "circularity": float(circularity) if 'circularity' in locals() else 0
+            "frame_number": frame_number,
+            "timestamp": frame_number / fps,
+            "sperm_count": len(boxes_xyxy),
+            "detections": {
+                "bbox": boxes_xyxy,
+                "center": centers,
+                "confidence": confidences
+            }
         }
     
-    def _calculate_image_statistics(self, detections: List[Dict], width: int, height: int) -> Dict[str, Any]:
+    def _format_frame_result(self, frame_result: Dict[str, Any], detections_format: str) -> Dict[str, Any]:
+        """Convert a frame's columnar detections into the API output format"""
+        columns = frame_result["detections"]
+        bboxes = columns["bbox"].tolist()
+        centers = columns["center"].tolist()
+        confidences = columns["confidence"].tolist()
+        
+        if detections_format == "columnar":
+            detections = {
+                "id": list(range(len(bboxes))),
+                "bbox": bboxes,
+                "center": centers,
+                "confidence": confidences
+            }
+        else:
+            frame_number = frame_result["frame_number"]
+            timestamp = frame_result["timestamp"]
+            detections = [
+                {
+                    "id": i,
+                    "bbox": bbox,
+                    "center": center,
+                    "confidence": confidence,
+                    "frame_number": frame_number,
+                    "timestamp": timestamp
+                }
+                for i, (bbox, center, confidence) in enumerate(zip(bboxes, centers, confidences))
+            ]
+        
+        return {**frame_result, "detections": detections}
+    
+    def _format_image_detections(self, boxes_xyxy: np.ndarray, confidences: np.ndarray, areas: np.ndarray,
+                                 aspect_ratios: np.ndarray, characteristics: List[Dict[str, Any]],
+                                 detections_format: str) -> Any:
+        """Build image detections as a list of dicts, or as one dict of columns"""
+        columns = {
+            "id": list(range(1, len(characteristics) + 1)),
+            "bbox": boxes_xyxy.tolist(),
+            "confidence": confidences.tolist(),
+            "area": areas.tolist(),
+            "aspect_ratio": aspect_ratios.tolist(),
+            "characteristics": characteristics
+        }
+        if detections_format == "columnar":
+            return columns
+        
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*columns.values())]
+    
+    def _calculate_image_statistics(self, characteristics: List[Dict], width: int, height: int) -> Dict[str, Any]:
         """Calculate overall statistics for image analysis"""
-        if not detections:
+        if not characteristics:
             return {
                 "density": 0.0,
                 "average_quality": 0.0,
@@ -394,14 +1106,14 @@ class SpermAnalyzer:
         
         # Calculate density (sperm per unit area)
         total_area = width * height
-        density = len(detections) / (total_area / 1000000)  # per mm²
+        density = len(characteristics) / (total_area / 1000000)  # per mm²
         
         # Calculate average quality
-        qualities = [d["characteristics"]["quality_score"] for d in detections]
+        qualities = [c["quality_score"] for c in characteristics]
         average_quality = np.mean(qualities) if qualities else 0.0
         
         # Morphology distribution
-        morphologies = [d["characteristics"]["morphology"] for d in detections]
+        morphologies = [c["morphology"] for c in characteristics]
         morphology_dist = {
             "normal": morphologies.count("normal"),
             "acceptable": morphologies.count("acceptable"),
@@ -409,7 +1121,7 @@ class SpermAnalyzer:
         }
         
         # Estimate concentration (assuming standard dilution)
-        concentration_per_ml = len(detections) * 10000  # Rough estimation
+        concentration_per_ml = len(characteristics) * 10000  # Rough estimation
         
         return {
             "density": float(density),
@@ -419,92 +1131,16 @@ class SpermAnalyzer:
             "total_analyzed_area": float(total_area)
         }
     
-    def _update_sperm_tracking(self, tracks: Dict, frame_result: Dict, frame_number: int):
+    def _update_sperm_tracking(self, tracker: SpermTracker, frame_result: Dict, frame_number: int):
         """Update sperm tracking across frames"""
-        current_detections = frame_result["detections"]
-        
-        # Simple tracking based on proximity
-        for detection in current_detections:
-            center = detection["center"]
-            matched_track = None
-            min_distance = float('inf')
-            
-            # Find closest existing track
-            for track_id, track in tracks.items():
-                if track["positions"]:
-                    last_pos = track["positions"][-1]
-                    distance = np.sqrt((center[0] - last_pos[0])**2 + (center[1] - last_pos[1])**2)
-                    if distance < min_distance and distance < 50:  # Threshold for same sperm
-                        min_distance = distance
-                        matched_track = track_id
-            
-            if matched_track:
-                # Update existing track
-                tracks[matched_track]["positions"].append(center)
-                tracks[matched_track]["timestamps"].append(detection["timestamp"])
-                tracks[matched_track]["last_seen"] = frame_number
-            else:
-                # Create new track
-                track_id = f"sperm_{len(tracks) + 1}"
-                tracks[track_id] = {
-                    "positions": [center],
-                    "timestamps": [detection["timestamp"]],
-                    "first_seen": frame_number,
-                    "last_seen": frame_number
-                }
+        tracker.update(frame_result["detections"]["center"], frame_result["timestamp"], frame_number)
     
-    def _calculate_motility_statistics(self, tracks: Dict, fps: float) -> Dict[str, Any]:
+    def _calculate_motility_statistics(self, tracks: TrackStore, fps: float) -> Dict[str, Any]:
         """Calculate motility statistics from tracking data"""
-        if not tracks:
-            return {
-                "total_motile_sperm": 0,
-                "motility_percentage": 0.0,
-                "average_velocity": 0.0,
-                "average_path_length": 0.0
-            }
-        
-        motile_count = 0
-        velocities = []
-        path_lengths = []
-        
-        for track_id, track in tracks.items():
-            positions = track["positions"]
-            timestamps = track["timestamps"]
-            
-            if len(positions) < 2:
-                continue
-            
-            # Calculate path length
-            path_length = 0
-            for i in range(1, len(positions)):
-                dx = positions[i][0] - positions[i-1][0]
-                dy = positions[i][1] - positions[i-1][1]
-                path_length += np.sqrt(dx**2 + dy**2)
-            
-            path_lengths.append(path_length)
-            
-            # Calculate average velocity
-            if len(timestamps) > 1:
-                total_time = timestamps[-1] - timestamps[0]
-                if total_time > 0:
-                    velocity = path_length / total_time  # pixels per second
-                    velocities.append(velocity)
-                    
-                    # Consider motile if moves significantly
-                    if velocity > 5:  # Threshold for motile sperm
-                        motile_count += 1
-        
-        total_sperm = len(tracks)
-        motility_percentage = (motile_count / total_sperm * 100) if total_sperm > 0 else 0
-        
-        return {
-            "total_sperm": total_sperm,
-            "total_motile_sperm": motile_count,
-            "motility_percentage": float(motility_percentage),
-            "average_velocity": float(np.mean(velocities)) if velocities else 0.0,
-            "average_path_length": float(np.mean(path_lengths)) if path_lengths else 0.0,
-            "velocity_std": float(np.std(velocities)) if velocities else 0.0
-        }
+        summary = TrackSummary()
+        if len(tracks):
+            summary.add(track_kinematics(tracks))
+        return summary.motility_statistics()
     
     def _generate_time_series_data(self, frame_analyses: List[Dict], fps: float) -> Dict[str, Any]:
         """Generate time series data for visualization"""
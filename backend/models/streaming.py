@@ -0,0 +1,210 @@
+import json
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from models.kinematics import TrackSummary, track_kinematics
+from models.track_store import TrackStore
+from models.tracking import SpermTracker
+
+class RunningTimeSeries:
+    """Per-frame sperm counts kept as at most ``max_points`` bins plus running count statistics.
+
+    Samples are appended one bin each until the series is full; then
+    neighbouring bins are merged pairwise and each bin takes twice as many
+    samples from then on.
+    """
+
+    def __init__(self, max_points: int = 1000):
+        self.max_points = max_points
+        self._bins: List[List[float]] = []  # [timestamp sum, count sum, samples]
+        self._samples_per_bin = 1
+
+        # Count statistics over every sample, and least-squares sums for the per-frame trend
+        self.samples = 0
+        self._count_sum = 0.0
+        self._count_square_sum = 0.0
+        self._index_sum = 0.0
+        self._index_square_sum = 0.0
+        self._index_count_sum = 0.0
+        self._min_count: Optional[int] = None
+        self._max_count: Optional[int] = None
+        self._last_timestamp = 0.0
+
+    def add(self, timestamp: float, count: int):
+        if self._bins and self._bins[-1][2] < self._samples_per_bin:
+            last = self._bins[-1]
+            last[0] += timestamp
+            last[1] += count
+            last[2] += 1
+        else:
+            if len(self._bins) >= self.max_points:
+                self._halve_bins()
+            self._bins.append([timestamp, count, 1])
+
+        index = self.samples
+        self.samples += 1
+        self._count_sum += count
+        self._count_square_sum += count ** 2
+        self._index_sum += index
+        self._index_square_sum += index ** 2
+        self._index_count_sum += index * count
+        self._min_count = count if self._min_count is None else min(self._min_count, count)
+        self._max_count = count if self._max_count is None else max(self._max_count, count)
+        self._last_timestamp = timestamp
+
+    def _halve_bins(self):
+        """Merge neighbouring bins pairwise"""
+        self._bins = [
+            [a[0] + b[0], a[1] + b[1], a[2] + b[2]] if b is not None else a
+            for a, b in zip(self._bins[::2], self._bins[1::2] + [None])
+        ]
+        self._samples_per_bin *= 2
+
+    def merge(self, other: "RunningTimeSeries"):
+        """Append a series that continues this one in time, e.g. the next video segment"""
+        if other.samples == 0:
+            return
+
+        self._bins.extend(list(b) for b in other._bins)
+        self._samples_per_bin = max(self._samples_per_bin, other._samples_per_bin)
+        while len(self._bins) > self.max_points:
+            self._halve_bins()
+
+        # The other series' sample indices continue after ours
+        offset, n = self.samples, other.samples
+        self._index_count_sum += other._index_count_sum + offset * other._count_sum
+        self._index_square_sum += other._index_square_sum + 2 * offset * other._index_sum + offset ** 2 * n
+        self._index_sum += other._index_sum + offset * n
+        self.samples += n
+        self._count_sum += other._count_sum
+        self._count_square_sum += other._count_square_sum
+        self._min_count = other._min_count if self._min_count is None else min(self._min_count, other._min_count)
+        self._max_count = other._max_count if self._max_count is None else max(self._max_count, other._max_count)
+        self._last_timestamp = other._last_timestamp
+
+    def count_statistics(self) -> Dict[str, Any]:
+        """Mean, spread, range and per-frame linear trend of the counts"""
+        if self.samples == 0:
+            return {"frames": 0}
+
+        n = self.samples
+        mean = self._count_sum / n
+        variance = max(self._count_square_sum / n - mean ** 2, 0.0)
+        denominator = n * self._index_square_sum - self._index_sum ** 2
+        slope = (n * self._index_count_sum - self._index_sum * self._count_sum) / denominator if denominator else 0.0
+        return {
+            "frames": n,
+            "mean": float(mean),
+            "std": float(np.sqrt(variance)),
+            "min": int(self._min_count),
+            "max": int(self._max_count),
+            "trend_slope": float(slope)
+        }
+
+    def to_dict(self, fps: float) -> Dict[str, Any]:
+        """Same shape as the full time series, with bin means in place of single frames"""
+        return {
+            "timestamps": [t / samples for t, _, samples in self._bins],
+            "sperm_counts": [c / samples for _, c, samples in self._bins],
+            "fps": fps,
+            "total_duration": self._last_timestamp,
+            "count_statistics": self.count_statistics()
+        }
+
+class DetectionSpill:
+    """Append-only JSON-lines file of raw per-frame detections"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, frame_result: Dict[str, Any]):
+        detections = frame_result["detections"]
+        record = {
+            "frame_number": frame_result["frame_number"],
+            "timestamp": frame_result["timestamp"],
+            "sperm_count": frame_result["sperm_count"],
+            "bbox": np.asarray(detections["bbox"]).tolist(),
+            "confidence": np.asarray(detections["confidence"]).tolist()
+        }
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._file.close()
+
+class StreamingFrameSink:
+    """Bounded-memory replacement for the ``frame_analyses`` list.
+
+    Frame results update a :class:`RunningTimeSeries` (and the optional
+    detection spill) and are then dropped. Tracks closed by the tracker are
+    reduced to :class:`TrackSummary` aggregates in chunks of ``close_chunk``
+    and their points removed from the track store.
+
+    For one time segment of a video, frames from ``end_frame`` on belong to
+    the next segment: they are tracked but not recorded, and tracks that
+    start there are dropped. Tracks seen before ``head_stop`` (the previous
+    segment's overlap) or at or after ``end_frame`` may continue in a
+    neighbouring segment, so they are kept whole in ``boundary_tracks`` for
+    stitching instead of being summarized.
+    """
+
+    def __init__(self, tracker: SpermTracker, spill_path: Optional[str] = None,
+                 max_time_series_points: int = 1000, close_chunk: int = 256,
+                 head_stop: Optional[int] = None, end_frame: Optional[int] = None):
+        self.tracker = tracker
+        self.close_chunk = close_chunk
+        self.head_stop = head_stop
+        self.end_frame = end_frame
+        self.frames = 0
+        self.time_series = RunningTimeSeries(max_time_series_points)
+        self.track_summary = TrackSummary()
+        self.boundary_tracks = TrackStore()
+        self.spill = DetectionSpill(spill_path) if spill_path else None
+        self._boundary: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return self.frames
+
+    def append(self, frame_result: Dict[str, Any]):
+        if self.end_frame is None or frame_result["frame_number"] < self.end_frame:
+            self.frames += 1
+            self.time_series.add(frame_result["timestamp"], frame_result["sperm_count"])
+            if self.spill is not None:
+                self.spill.write(frame_result)
+
+        if self.tracker.closed_track_count >= self.close_chunk:
+            self._reduce_closed_tracks()
+
+    def _reduce_closed_tracks(self):
+        closed = self.tracker.pop_closed_tracks()
+        if not len(closed):
+            return
+
+        store = self.tracker.store
+        first_seen = store.first_seen[closed]
+        later = np.zeros(len(closed), dtype=bool)
+        boundary = np.zeros(len(closed), dtype=bool)
+        if self.head_stop is not None:
+            boundary |= first_seen < self.head_stop
+        if self.end_frame is not None:
+            later = first_seen >= self.end_frame
+            boundary |= store.last_seen[closed] >= self.end_frame
+            boundary &= ~later
+            if later.any():
+                store.split_off(closed[later])
+
+        # Boundary tracks keep their points in the tracker's store until finish()
+        if boundary.any():
+            self._boundary.append(closed[boundary])
+        summarized = closed[~boundary & ~later]
+        if len(summarized):
+            self.track_summary.add(track_kinematics(store.split_off(summarized)))
+
+    def finish(self):
+        """Summarize the tracks still open and close the spill file"""
+        self.tracker.close_all()
+        self._reduce_closed_tracks()
+        if self._boundary:
+            self.boundary_tracks = self.tracker.store.split_off(np.concatenate(self._boundary))
+        if self.spill is not None:
+            self.spill.close()
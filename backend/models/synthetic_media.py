@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from models.track_store import TrackStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sprite bank: heading bins x tail lengths x flagellum beat phases
+HEADING_BINS = 16
+TAIL_LENGTHS = (30, 45, 60, 80)  # The 30-80 px range of SpermAnalyzer._synthetic_sample
+BEAT_PHASES = 4
+HEAD_SIZE = 10
+TAIL_WIDTH = 12
+BACKGROUND_NOISE = 30
+NOISE_FRAMES = 16  # Video backgrounds are drawn from this many pre-generated noise frames
+
+# Benchmark corpus: image sizes x densities, video speeds x densities
+CORPUS_IMAGE_SIZES = ((640, 640), (1280, 960), (2048, 1536))
+CORPUS_IMAGE_DENSITIES = (15, 30, 60)
+CORPUS_VIDEO_SPEEDS = (30, 60, 120)
+CORPUS_VIDEO_DENSITIES = (15, 30)
+
+class SpriteBank:
+    """Pre-rendered sperm shapes for every heading, tail length and beat phase.
+
+    Shapes follow ``SpermAnalyzer._synthetic_sample``: an elliptic head and
+    the tail polyline of ``_generate_tail_points``, trailing behind the head
+    and flipping its curve as the flagellum beats. Each sprite is stored as
+    pixel offsets padded to a common length, so all sperm of a frame are
+    drawn with a single fancy-index assignment.
+    """
+
+    def __init__(self, head_size: int = HEAD_SIZE, tail_width: int = TAIL_WIDTH):
+        from models.sperm_analyzer import SpermAnalyzer
+        generate_tail_points = SpermAnalyzer()._generate_tail_points
+
+        sprites = []
+        for heading_bin in range(HEADING_BINS):
+            angle = 2 * np.pi * heading_bin / HEADING_BINS
+            for length in TAIL_LENGTHS:
+                tail = np.array(generate_tail_points(0, 0, length, tail_width), dtype=np.float64)
+                for phase in range(BEAT_PHASES):
+                    beat = np.cos(2 * np.pi * phase / BEAT_PHASES)
+                    local_tail = np.column_stack([-tail[:, 0], tail[:, 1] * beat])
+                    sprites.append(self._render(local_tail, angle, head_size))
+
+        size = max(len(dy) for dy, _ in sprites)
+        self.dy = np.zeros((len(sprites), size), dtype=np.int32)
+        self.dx = np.zeros((len(sprites), size), dtype=np.int32)
+        self.valid = np.zeros((len(sprites), size), dtype=bool)
+        # Box offsets around the head center: (min dx, min dy, max dx, max dy)
+        self.box = np.zeros((len(sprites), 4), dtype=np.int32)
+        for index, (dy, dx) in enumerate(sprites):
+            self.dy[index, :len(dy)] = dy
+            self.dx[index, :len(dx)] = dx
+            self.valid[index, :len(dy)] = True
+            self.box[index] = (dx.min(), dy.min(), dx.max(), dy.max())
+
+    @staticmethod
+    def _render(tail: np.ndarray, angle: float, head_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Pixel offsets of one sperm whose head is at the origin, heading along ``angle``"""
+        extent = int(np.ceil(max(np.abs(tail).max(), head_size))) + 2
+        canvas = np.zeros((2 * extent + 1, 2 * extent + 1), dtype=np.uint8)
+
+        # Drawn once per sprite with the same primitives as _synthetic_sample
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+        tail_points = np.round(tail @ rotation.T + extent).astype(np.int32)
+        cv2.ellipse(canvas, (extent, extent), (head_size, head_size // 2), float(np.degrees(angle)), 0, 360, 255, -1)
+        cv2.polylines(canvas, [tail_points], False, 255, 2)
+
+        ys, xs = np.nonzero(canvas)
+        return ys - extent, xs - extent
+
+    def sprite_ids(self, headings: np.ndarray, length_indices: np.ndarray, phases: np.ndarray) -> np.ndarray:
+        """Sprite index for each sperm"""
+        heading_bins = np.round(headings / (2 * np.pi) * HEADING_BINS).astype(np.int64) % HEADING_BINS
+        return (heading_bins * len(TAIL_LENGTHS) + length_indices) * BEAT_PHASES + phases % BEAT_PHASES
+
+    def draw(self, frame: np.ndarray, positions: np.ndarray, sprite_ids: np.ndarray, value: int = 255):
+        """Draw every sperm into ``frame`` in one vectorized pass"""
+        height, width = frame.shape[:2]
+        centers = np.round(positions).astype(np.int64)
+        ys = centers[:, 1:2] + self.dy[sprite_ids]
+        xs = centers[:, 0:1] + self.dx[sprite_ids]
+        inside = self.valid[sprite_ids] & (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+        frame[ys[inside], xs[inside]] = value
+
+    def boxes(self, positions: np.ndarray, sprite_ids: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Ground-truth ``(N, 4)`` xyxy boxes, clipped to the image"""
+        centers = np.round(positions)
+        boxes = np.concatenate([centers, centers], axis=1) + self.box[sprite_ids]
+        return np.clip(boxes, 0, [width - 1, height - 1, width - 1, height - 1]).astype(np.float32)
+
+# Per-process sprite bank, built on first use
+_sprite_bank: Optional[SpriteBank] = None
+
+def sprite_bank() -> SpriteBank:
+    global _sprite_bank
+    if _sprite_bank is None:
+        _sprite_bank = SpriteBank()
+    return _sprite_bank
+
+def sperm_count(width: int, height: int, density: float) -> int:
+    """Number of sperm for ``density`` sperm per megapixel"""
+    return max(1, int(round(density * width * height / 1e6)))
+
+def simulate_swimming(rng: np.random.Generator, count: int, frames: int, fps: float, width: int, height: int,
+                      speed: float = 60.0, motile_fraction: float = 0.7,
+                      turn_rate: float = 1.0) -> Dict[str, np.ndarray]:
+    """Head positions of ``count`` sperm over ``frames`` frames.
+
+    Motile sperm swim at about ``speed`` px/s along a heading that wanders by
+    ``turn_rate`` rad/sqrt(s) and bounce off the image borders; the others stay
+    put. Returns ``positions`` ``(frames, count, 2)``, ``headings``
+    ``(frames, count)`` and per-sperm ``motile`` and ``speed`` arrays.
+    """
+    motile = rng.random(count) < motile_fraction
+    speeds = np.where(motile, np.clip(rng.normal(speed, 0.25 * speed, count), 0.2 * speed, None), 0.0)
+
+    headings = rng.uniform(0, 2 * np.pi, count) + np.cumsum(
+        rng.normal(0, turn_rate / np.sqrt(fps), (frames, count)), axis=0
+    )
+    steps = (speeds / fps)[None, :, None] * np.stack([np.cos(headings), np.sin(headings)], axis=2)
+    steps[0] = 0
+    start = rng.uniform([0, 0], [width, height], (count, 2))
+    unfolded = start + np.cumsum(steps, axis=0)
+
+    # Reflect at the borders: fold the free path into [0, size]
+    size = np.array([width - 1, height - 1], dtype=np.float64)
+    folded = np.mod(unfolded, 2 * size)
+    positions = np.where(folded > size, 2 * size - folded, folded)
+
+    # Drawn headings follow the actual (reflected) motion
+    drawn = headings.copy()
+    if frames > 1:
+        motion = np.diff(positions, axis=0, prepend=positions[:1] - steps[1:2])
+        drawn = np.where(speeds > 0, np.arctan2(motion[..., 1], motion[..., 0]), headings[:1])
+    return {"positions": positions, "headings": drawn, "motile": motile, "speed": speeds}
+
+def _background(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    return rng.integers(0, BACKGROUND_NOISE, (height, width, 3), dtype=np.uint8)
+
+def generate_image(seed: Any, width: int = 640, height: int = 640,
+                   density: float = 30.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Seeded still image and its ground-truth ``(N, 4)`` xyxy boxes"""
+    rng = np.random.default_rng(seed)
+    bank = sprite_bank()
+    count = sperm_count(width, height, density)
+    scene = simulate_swimming(rng, count, 1, 1.0, width, height)
+
+    ids = bank.sprite_ids(scene["headings"][0], rng.integers(0, len(TAIL_LENGTHS), count),
+                          rng.integers(0, BEAT_PHASES, count))
+    image = _background(rng, width, height)
+    bank.draw(image, scene["positions"][0], ids)
+    return image, bank.boxes(scene["positions"][0], ids, width, height)
+
+def generate_video(path: str, seed: Any, frames: int = 150, fps: float = 25.0, width: int = 640,
+                   height: int = 480, density: float = 30.0, speed: float = 60.0,
+                   motile_fraction: float = 0.7) -> Dict[str, Any]:
+    """Write a seeded video of swimming sperm and return its ground truth.
+
+    Ground-truth tracks are head centers on every frame, in the
+    :class:`TrackStore` columnar format of the analysis results.
+    """
+    rng = np.random.default_rng(seed)
+    bank = sprite_bank()
+    count = sperm_count(width, height, density)
+    scene = simulate_swimming(rng, count, frames, fps, width, height, speed=speed, motile_fraction=motile_fraction)
+
+    length_indices = rng.integers(0, len(TAIL_LENGTHS), count)
+    phase_offsets = rng.integers(0, BEAT_PHASES, count)
+    noise_frames = [_background(rng, width, height) for _ in range(min(NOISE_FRAMES, frames))]
+    backgrounds = rng.integers(0, len(noise_frames), frames)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open video writer for {path}")
+    try:
+        for frame_number in range(frames):
+            # Motile sperm beat their flagellum once every BEAT_PHASES frames
+            phases = phase_offsets + np.where(scene["motile"], frame_number, 0)
+            ids = bank.sprite_ids(scene["headings"][frame_number], length_indices, phases)
+            frame = noise_frames[backgrounds[frame_number]].copy()
+            bank.draw(frame, scene["positions"][frame_number], ids)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    store = TrackStore(initial_capacity=frames * count)
+    store.new_tracks(count, 0)
+    store.extend(
+        np.tile(np.arange(count), frames),
+        np.repeat(np.arange(frames), count),
+        scene["positions"].reshape(-1, 2),
+        np.repeat(np.arange(frames) / fps, count)
+    )
+    return {
+        "sperm_count": count,
+        "motile_count": int(scene["motile"].sum()),
+        "motile": scene["motile"].tolist(),
+        "speed": np.round(scene["speed"], 3).tolist(),
+        "tracks": store.to_dict()
+    }
+
+def corpus_items(seed: int = 0, images: int = 9, videos: int = 6, video_frames: int = 150,
+                 video_fps: float = 25.0) -> List[Dict[str, Any]]:
+    """Benchmark workload: images over sizes and densities, videos over speeds and densities"""
+    items = []
+    for index in range(images):
+        width, height = CORPUS_IMAGE_SIZES[index % len(CORPUS_IMAGE_SIZES)]
+        density = CORPUS_IMAGE_DENSITIES[index // len(CORPUS_IMAGE_SIZES) % len(CORPUS_IMAGE_DENSITIES)]
+        items.append({"kind": "image", "name": f"image_{index:03d}", "seed": [seed, 0, index],
+                      "width": width, "height": height, "density": density})
+    for index in range(videos):
+        speed = CORPUS_VIDEO_SPEEDS[index % len(CORPUS_VIDEO_SPEEDS)]
+        density = CORPUS_VIDEO_DENSITIES[index // len(CORPUS_VIDEO_SPEEDS) % len(CORPUS_VIDEO_DENSITIES)]
+        items.append({"kind": "video", "name": f"video_{index:03d}", "seed": [seed, 1, index],
+                      "width": 640, "height": 480, "density": density, "speed": speed,
+                      "frames": video_frames, "fps": video_fps})
+    return items
+
+def _generate_item(task: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Write one corpus item with its ground truth and return its manifest entry"""
+    output_dir, item = task
+    entry = dict(item)
+    if item["kind"] == "image":
+        image, boxes = generate_image(item["seed"], item["width"], item["height"], item["density"])
+        entry["file"] = f"{item['name']}.png"
+        entry["labels"] = f"{item['name']}.txt"
+        cv2.imwrite(os.path.join(output_dir, entry["file"]), image)
+
+        # YOLO format like the training data: class, normalized center and size
+        scale = np.array([item["width"], item["height"]], dtype=np.float64)
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2 / scale
+        sizes = (boxes[:, 2:] - boxes[:, :2]) / scale
+        with open(os.path.join(output_dir, entry["labels"]), 'w') as f:
+            f.write('\n'.join(f"0 {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}"
+                              for (cx, cy), (w, h) in zip(centers.tolist(), sizes.tolist())))
+        entry["sperm_count"] = len(boxes)
+    else:
+        entry["file"] = f"{item['name']}.avi"
+        entry["ground_truth"] = f"{item['name']}.tracks.json"
+        truth = generate_video(os.path.join(output_dir, entry["file"]), item["seed"], frames=item["frames"],
+                               fps=item["fps"], width=item["width"], height=item["height"],
+                               density=item["density"], speed=item["speed"])
+        with open(os.path.join(output_dir, entry["ground_truth"]), 'w') as f:
+            json.dump(truth, f)
+        entry["sperm_count"] = truth["sperm_count"]
+        entry["motile_count"] = truth["motile_count"]
+    return entry
+
+def build_corpus(output_dir: str, items: List[Dict[str, Any]], workers: Optional[int] = None) -> str:
+    """Generate ``items`` in parallel processes and write ``manifest.json``; returns its path"""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Generating {len(items)} corpus items with {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(_generate_item, [(output_dir, item) for item in items]))
+
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    with open(manifest_path, 'w') as f:
+        json.dump({"items": entries}, f, indent=2)
+    return manifest_path
+
+def main():
+    """Generate the synthetic benchmark corpus"""
+    parser = argparse.ArgumentParser(description="Deterministic synthetic sperm images and videos")
+    parser.add_argument("--output", default="data/benchmark", help="Corpus directory")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--images", type=int, default=9, help="Number of images")
+    parser.add_argument("--videos", type=int, default=6, help="Number of videos")
+    parser.add_argument("--frames", type=int, default=150, help="Frames per video")
+    parser.add_argument("--fps", type=float, default=25.0, help="Video frame rate")
+    parser.add_argument("--workers", type=int, help="Generator processes (default: all cores)")
+    args = parser.parse_args()
+
+    items = corpus_items(args.seed, args.images, args.videos, args.frames, args.fps)
+    print(build_corpus(args.output, items, args.workers))
+
+if __name__ == "__main__":
+    main()
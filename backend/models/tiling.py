@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+def tile_origins(length: int, tile_size: int, stride: int) -> List[int]:
+    """Start offsets along one axis so that tiles cover ``[0, length)`` with the given stride"""
+    if length <= tile_size:
+        return [0]
+
+    origins = list(range(0, length - tile_size + 1, stride))
+    # Align a final tile with the far edge instead of leaving a strip uncovered
+    if origins[-1] + tile_size < length:
+        origins.append(length - tile_size)
+    return origins
+
+def extract_tiles(image: np.ndarray, tile_size: int, overlap: float) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Split an image into overlapping, equally sized tiles.
+
+    Returns the tiles and an ``(N, 2)`` array of their ``(x, y)`` offsets in
+    the source image. Images smaller than a tile are padded, so every tile has
+    the same shape and can be batched.
+    """
+    height, width = image.shape[:2]
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    tiles = []
+    offsets = []
+    for y in tile_origins(height, tile_size, stride):
+        for x in tile_origins(width, tile_size, stride):
+            tile = image[y:y + tile_size, x:x + tile_size]
+            pad_bottom = tile_size - tile.shape[0]
+            pad_right = tile_size - tile.shape[1]
+            if pad_bottom or pad_right:
+                tile = cv2.copyMakeBorder(tile, 0, pad_bottom, 0, pad_right,
+                                          cv2.BORDER_CONSTANT, value=(114, 114, 114))
+            tiles.append(np.ascontiguousarray(tile))
+            offsets.append((x, y))
+
+    return tiles, np.array(offsets, dtype=np.float32)
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, threshold: float,
+                        metric: str = "ios", groups: Optional[np.ndarray] = None) -> np.ndarray:
+    """Greedy NMS over xyxy boxes, returning kept indices in descending score order.
+
+    ``metric="ios"`` (intersection over the smaller box) also suppresses the
+    truncated half of a cell cut by a tile border, which plain IoU misses.
+    With ``groups`` only boxes from different groups suppress each other.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    areas = np.prod(np.clip(boxes[:, 2:] - boxes[:, :2], 0, None), axis=1)
+    order = np.argsort(-scores)
+    keep = []
+
+    while order.size > 0:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+
+        top_left = np.maximum(boxes[best, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+
+        if metric == "ios":
+            denominator = np.minimum(areas[best], areas[rest])
+        else:
+            denominator = areas[best] + areas[rest] - intersection
+        overlap = intersection / np.maximum(denominator, 1e-9)
+
+        suppressed = overlap > threshold
+        if groups is not None:
+            suppressed &= groups[rest] != groups[best]
+        order = rest[~suppressed]
+
+    return np.array(keep, dtype=np.int64)
+
+def merge_tile_detections(tile_boxes: List[np.ndarray], tile_scores: List[np.ndarray], offsets: np.ndarray,
+                          image_width: int, image_height: int,
+                          threshold: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+    """Shift per-tile detections into image coordinates and merge them with cross-tile NMS.
+
+    Only boxes from different tiles suppress each other (the duplicates of a
+    sperm cut by or repeated across a tile border); overlaps within one tile
+    were already resolved by the model's own NMS.
+    """
+    shifted = [
+        boxes + np.tile(offset, 2)
+        for boxes, offset in zip(tile_boxes, offsets)
+        if len(boxes)
+    ]
+    if not shifted:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    boxes = np.concatenate(shifted).astype(np.float32)
+    scores = np.concatenate([s for s in tile_scores if len(s)]).astype(np.float32)
+    tile_indices = np.concatenate([np.full(len(b), i) for i, b in enumerate(tile_boxes) if len(b)])
+
+    # Padding can produce boxes that extend past the real image border
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, image_width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, image_height)
+
+    keep = non_max_suppression(boxes, scores, threshold, groups=tile_indices)
+    return boxes[keep], scores[keep]
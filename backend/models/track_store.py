@@ -0,0 +1,205 @@
+import numpy as np
+from typing import Any, Dict, Iterator, Tuple
+
+TRACK_FORMAT = "columnar"
+
+class TrackStore:
+    """Struct-of-arrays storage for sperm track points.
+
+    Points live in contiguous per-column arrays (track index, frame, x, y,
+    timestamp) that grow by amortized doubling; per-track metadata
+    (first/last seen frame) is stored the same way. Reading a track sorts the
+    points by track once and hands out slices, so per-track access is a view,
+    not a copy.
+    """
+
+    _POINT_COLUMNS = {
+        "track": np.int32,
+        "frame": np.int32,
+        "x": np.float32,
+        "y": np.float32,
+        "timestamp": np.float64,
+    }
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._points = {name: np.empty(initial_capacity, dtype=dtype)
+                        for name, dtype in self._POINT_COLUMNS.items()}
+        self._point_count = 0
+
+        self._first_seen = np.empty(64, dtype=np.int32)
+        self._last_seen = np.empty(64, dtype=np.int32)
+        self._track_count = 0
+
+        # Points grouped by track: (sorted point columns, per-track offsets), rebuilt lazily
+        self._grouped = None
+
+    def __len__(self) -> int:
+        return self._track_count
+
+    @property
+    def point_count(self) -> int:
+        return self._point_count
+
+    @staticmethod
+    def _grow(array: np.ndarray, required: int) -> np.ndarray:
+        """Return ``array`` with capacity for at least ``required`` items"""
+        if required <= len(array):
+            return array
+        grown = np.empty(max(required, len(array) * 2), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def new_tracks(self, count: int, frame_number: int) -> np.ndarray:
+        """Create ``count`` empty tracks and return their indices"""
+        start, end = self._track_count, self._track_count + count
+        self._first_seen = self._grow(self._first_seen, end)
+        self._last_seen = self._grow(self._last_seen, end)
+        self._first_seen[start:end] = frame_number
+        self._last_seen[start:end] = frame_number
+        self._track_count = end
+        return np.arange(start, end)
+
+    def append(self, track_indices: np.ndarray, frame_number: int, positions: np.ndarray, timestamp: float):
+        """Append one frame's points for the given tracks"""
+        count = len(track_indices)
+        self.extend(track_indices, np.full(count, frame_number), positions, np.full(count, timestamp))
+
+    def extend(self, track_indices: np.ndarray, frame_numbers: np.ndarray, positions: np.ndarray,
+               timestamps: np.ndarray):
+        """Append points spanning several frames, given in time order per track"""
+        count = len(track_indices)
+        if count == 0:
+            return
+
+        start, end = self._point_count, self._point_count + count
+        for name in self._points:
+            self._points[name] = self._grow(self._points[name], end)
+
+        self._points["track"][start:end] = track_indices
+        self._points["frame"][start:end] = frame_numbers
+        self._points["x"][start:end] = positions[:, 0]
+        self._points["y"][start:end] = positions[:, 1]
+        self._points["timestamp"][start:end] = timestamps
+        np.maximum.at(self._last_seen, track_indices, frame_numbers)
+
+        self._point_count = end
+        self._grouped = None
+
+    def split_off(self, track_indices: np.ndarray) -> "TrackStore":
+        """Move the points of ``track_indices`` into a new store (indexed in the given order).
+
+        The tracks keep their index here with no points left, so indices held
+        by a tracker stay valid while finished tracks stop using memory.
+        """
+        track_indices = np.asarray(track_indices, dtype=np.int64)
+        point_tracks = self.column("track")
+        moving = np.isin(point_tracks, track_indices)
+
+        remap = np.full(self._track_count, -1, dtype=np.int64)
+        remap[track_indices] = np.arange(len(track_indices))
+        split = TrackStore(initial_capacity=max(int(moving.sum()), 1))
+        split.new_tracks(len(track_indices), 0)
+        split._first_seen[:len(track_indices)] = self._first_seen[track_indices]
+        split._last_seen[:len(track_indices)] = self._last_seen[track_indices]
+        split.extend(
+            remap[point_tracks[moving]],
+            self.column("frame")[moving],
+            np.column_stack([self.column("x")[moving], self.column("y")[moving]]),
+            self.column("timestamp")[moving]
+        )
+
+        remaining = ~moving
+        count = int(remaining.sum())
+        for name in self._points:
+            self._points[name][:count] = self.column(name)[remaining]
+        self._point_count = count
+        self._grouped = None
+        return split
+
+    def column(self, name: str) -> np.ndarray:
+        """Points of one column in append order"""
+        return self._points[name][:self._point_count]
+
+    @property
+    def first_seen(self) -> np.ndarray:
+        return self._first_seen[:self._track_count]
+
+    @property
+    def last_seen(self) -> np.ndarray:
+        return self._last_seen[:self._track_count]
+
+    def grouped(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Point columns sorted by track (time order kept) and ``offsets`` so that
+        track ``i`` spans ``offsets[i]:offsets[i + 1]``"""
+        if self._grouped is None:
+            order = np.argsort(self.column("track"), kind="stable")
+            columns = {name: self.column(name)[order] for name in self._points}
+            counts = np.bincount(columns["track"], minlength=self._track_count)
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            self._grouped = (columns, offsets)
+        return self._grouped
+
+    def track(self, index: int) -> Dict[str, np.ndarray]:
+        """Views of one track's point columns"""
+        columns, offsets = self.grouped()
+        start, end = offsets[index], offsets[index + 1]
+        return {name: values[start:end] for name, values in columns.items()}
+
+    def iter_tracks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """Views of every track in index order"""
+        for index in range(self._track_count):
+            yield self.track(index)
+
+    @staticmethod
+    def track_id(index: int) -> str:
+        """Public track identifier for a track index"""
+        return f"sperm_{index + 1}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready columnar representation, points grouped by track"""
+        columns, offsets = self.grouped()
+        return {
+            "format": TRACK_FORMAT,
+            "track_count": self._track_count,
+            "offsets": offsets.tolist(),
+            "first_seen": self.first_seen.tolist(),
+            "last_seen": self.last_seen.tolist(),
+            "frame": columns["frame"].tolist(),
+            "x": np.round(columns["x"].astype(np.float64), 2).tolist(),
+            "y": np.round(columns["y"].astype(np.float64), 2).tolist(),
+            "timestamp": np.round(columns["timestamp"], 4).tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrackStore":
+        """Rebuild a store from :meth:`to_dict` output or a legacy ``{"sperm_N": {...}}`` dict"""
+        if data.get("format") != TRACK_FORMAT:
+            return cls._from_legacy_dict(data)
+
+        offsets = np.asarray(data["offsets"], dtype=np.int64)
+        point_count = int(offsets[-1]) if len(offsets) else 0
+        store = cls(initial_capacity=max(point_count, 1))
+
+        track_count = int(data["track_count"])
+        store.new_tracks(track_count, 0)
+        store._first_seen[:track_count] = data["first_seen"]
+        store._last_seen[:track_count] = data["last_seen"]
+
+        store._points["track"][:point_count] = np.repeat(np.arange(track_count), np.diff(offsets))
+        for name in ("frame", "x", "y", "timestamp"):
+            store._points[name][:point_count] = data[name]
+        store._point_count = point_count
+        return store
+
+    @classmethod
+    def _from_legacy_dict(cls, tracks: Dict[str, Any]) -> "TrackStore":
+        """Convert the dict-of-lists track format used by older results"""
+        store = cls()
+        for track in tracks.values():
+            index = store.new_tracks(1, track.get("first_seen", 0))
+            positions = np.asarray(track.get("positions", []), dtype=np.float64).reshape(-1, 2)
+            # Legacy tracks did not record per-point frame numbers
+            for position, timestamp in zip(positions, track.get("timestamps", [])):
+                store.append(index, -1, position[np.newaxis], timestamp)
+            store._last_seen[index] = track.get("last_seen", 0)
+        return store
@@ -0,0 +1,229 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from models.track_store import TrackStore
+
+# Cost for detection/track pairs outside the gating radius; never accepted as a match
+_UNREACHABLE = 1e9
+
+MOTION_MODELS = ("kalman", "static")
+
+# Constant-velocity model: state [x, y, vx, vy], position-only measurements
+_H = np.array([[1.0, 0.0, 0.0, 0.0],
+               [0.0, 1.0, 0.0, 0.0]])
+
+class SpermTracker:
+    """Frame-to-frame sperm tracker with bounded per-frame cost.
+
+    Only tracks seen within ``max_gap_frames`` are considered for matching,
+    candidate pairs come from a KD-tree over the active track heads, and each
+    frame is assigned with a globally optimal (Hungarian) matching instead of
+    greedy nearest-first association.
+
+    With the default ``"kalman"`` motion model every active track carries a
+    constant-velocity Kalman filter; heads are predicted to the current frame
+    time before association, so fast progressive sperm stay on one track even
+    when they move farther than ``max_distance`` between sampled frames. The
+    gate widens with the predicted position uncertainty (up to
+    ``max_gate_distance``) for tracks whose velocity is not yet known.
+    ``"static"`` matches against the last seen position.
+
+    With ``report_closed`` the store indices of expired tracks are collected
+    for :meth:`pop_closed_tracks`, so a caller can summarize and drop them.
+    """
+
+    def __init__(self, max_distance: float = 50.0, max_gap_frames: Optional[int] = None,
+                 motion_model: str = "kalman", measurement_std: float = 3.0,
+                 acceleration_std: float = 100.0, initial_velocity_std: float = 250.0,
+                 max_gate_distance: Optional[float] = None, report_closed: bool = False):
+        if motion_model not in MOTION_MODELS:
+            raise ValueError(f"Unknown motion model '{motion_model}', expected one of {MOTION_MODELS}")
+
+        self.max_distance = max_distance
+        self.max_gap_frames = max_gap_frames
+        self.motion_model = motion_model
+        self.max_gate_distance = max_gate_distance or max_distance * 3
+
+        # Kalman noise parameters in pixels and seconds
+        self.measurement_var = measurement_std ** 2
+        self.acceleration_var = acceleration_std ** 2
+        self.initial_velocity_var = initial_velocity_std ** 2
+
+        self.store = TrackStore()
+        self.report_closed = report_closed
+        self._closed = []
+        self._closed_count = 0
+
+        # Active tracks: store indices, last_seen frames, filter state/covariance and time of last update
+        self._active_tracks = np.zeros(0, dtype=np.int64)
+        self._active_last_seen = np.zeros(0, dtype=np.int64)
+        self._active_state = np.zeros((0, 4))
+        self._active_cov = np.zeros((0, 4, 4))
+        self._active_time = np.zeros(0)
+
+    def update(self, centers: np.ndarray, timestamp: float, frame_number: int):
+        """Associate one frame's detection centers with the active tracks"""
+        self._expire(frame_number)
+
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        predicted_state, predicted_cov = self._predict(timestamp)
+        detection_tracks = self._assign(centers, predicted_state, predicted_cov)
+
+        matched = detection_tracks >= 0
+        track_indices = detection_tracks[matched]
+
+        # Unmatched detections start new tracks, numbered in detection order
+        point_tracks = np.empty(len(centers), dtype=np.int64)
+        point_tracks[matched] = self._active_tracks[track_indices]
+        new_tracks = self.store.new_tracks(int((~matched).sum()), frame_number)
+        point_tracks[~matched] = new_tracks
+        self.store.append(point_tracks, frame_number, centers, timestamp)
+
+        self._correct(track_indices, centers[matched], predicted_state[track_indices],
+                      predicted_cov[track_indices])
+        self._active_last_seen[track_indices] = frame_number
+        self._active_time[track_indices] = timestamp
+
+        if len(new_tracks):
+            self._start_tracks(new_tracks, centers[~matched], timestamp, frame_number)
+
+    def _start_tracks(self, track_indices: np.ndarray, centers: np.ndarray, timestamp: float, frame_number: int):
+        """Activate new tracks at rest with an uncertain velocity"""
+        count = len(track_indices)
+        state = np.zeros((count, 4))
+        state[:, :2] = centers
+        cov = np.zeros((count, 4, 4))
+        cov[:, 0, 0] = cov[:, 1, 1] = self.measurement_var
+        cov[:, 2, 2] = cov[:, 3, 3] = self.initial_velocity_var
+
+        self._active_tracks = np.concatenate([self._active_tracks, track_indices])
+        self._active_last_seen = np.concatenate([self._active_last_seen, np.full(count, frame_number, dtype=np.int64)])
+        self._active_state = np.concatenate([self._active_state, state])
+        self._active_cov = np.concatenate([self._active_cov, cov])
+        self._active_time = np.concatenate([self._active_time, np.full(count, timestamp)])
+
+    def _expire(self, frame_number: int):
+        """Drop tracks not seen within ``max_gap_frames`` from the active set"""
+        if self.max_gap_frames is None or not len(self._active_tracks):
+            return
+
+        alive = frame_number - self._active_last_seen <= self.max_gap_frames
+        if alive.all():
+            return
+
+        if self.report_closed:
+            self._closed.append(self._active_tracks[~alive])
+            self._closed_count += int((~alive).sum())
+        self._active_tracks = self._active_tracks[alive]
+        self._active_last_seen = self._active_last_seen[alive]
+        self._active_state = self._active_state[alive]
+        self._active_cov = self._active_cov[alive]
+        self._active_time = self._active_time[alive]
+
+    def _predict(self, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict every active track from its last update to ``timestamp``"""
+        if self.motion_model == "static" or not len(self._active_tracks):
+            return self._active_state.copy(), self._active_cov.copy()
+
+        dt = timestamp - self._active_time
+        count = len(dt)
+
+        transition = np.tile(np.eye(4), (count, 1, 1))
+        transition[:, 0, 2] = transition[:, 1, 3] = dt
+
+        # Discrete white-noise acceleration
+        process = np.zeros((count, 4, 4))
+        process[:, 0, 0] = process[:, 1, 1] = dt ** 4 / 4
+        process[:, 0, 2] = process[:, 2, 0] = process[:, 1, 3] = process[:, 3, 1] = dt ** 3 / 2
+        process[:, 2, 2] = process[:, 3, 3] = dt ** 2
+        process *= self.acceleration_var
+
+        state = np.einsum("kij,kj->ki", transition, self._active_state)
+        cov = transition @ self._active_cov @ transition.transpose(0, 2, 1) + process
+        return state, cov
+
+    def _correct(self, track_indices: np.ndarray, measurements: np.ndarray,
+                 predicted_state: np.ndarray, predicted_cov: np.ndarray):
+        """Kalman update of the matched tracks with their detections"""
+        if len(track_indices) == 0:
+            return
+
+        if self.motion_model == "static":
+            self._active_state[track_indices, :2] = measurements
+            return
+
+        innovation = measurements - predicted_state[:, :2]
+        innovation_cov = predicted_cov[:, :2, :2] + np.eye(2) * self.measurement_var
+        gain = predicted_cov[:, :, :2] @ np.linalg.inv(innovation_cov)
+
+        self._active_state[track_indices] = predicted_state + np.einsum("kij,kj->ki", gain, innovation)
+        self._active_cov[track_indices] = (np.eye(4) - gain @ _H) @ predicted_cov
+
+    def _gates(self, predicted_cov: np.ndarray) -> np.ndarray:
+        """Per-track association radius"""
+        if self.motion_model == "static":
+            return np.full(len(predicted_cov), self.max_distance)
+
+        # 3 sigma of the predicted position, never tighter than max_distance
+        position_std = np.sqrt(np.maximum(predicted_cov[:, 0, 0], predicted_cov[:, 1, 1]))
+        return np.clip(3 * position_std, self.max_distance, self.max_gate_distance)
+
+    def _assign(self, centers: np.ndarray, predicted_state: np.ndarray,
+                predicted_cov: np.ndarray) -> np.ndarray:
+        """Return the active-track index matched to each detection, or -1"""
+        assignment = np.full(len(centers), -1, dtype=np.int64)
+        if len(centers) == 0 or not len(self._active_tracks):
+            return assignment
+
+        # scipy is imported on first use to keep the API process quick to start
+        from scipy.optimize import linear_sum_assignment
+        from scipy.spatial import cKDTree
+        
+        gates = self._gates(predicted_cov)
+
+        # Candidate pairs within each track's gating radius only
+        pairs = cKDTree(centers).sparse_distance_matrix(
+            cKDTree(predicted_state[:, :2]), float(gates.max()), output_type="ndarray"
+        )
+        pairs = pairs[pairs["v"] < gates[pairs["j"]]]
+        if len(pairs) == 0:
+            return assignment
+
+        # Solve the assignment on the detections and tracks that have any candidate
+        rows, row_index = np.unique(pairs["i"], return_inverse=True)
+        cols, col_index = np.unique(pairs["j"], return_inverse=True)
+        cost = np.full((len(rows), len(cols)), _UNREACHABLE)
+        cost[row_index, col_index] = pairs["v"]
+
+        matched_rows, matched_cols = linear_sum_assignment(cost)
+        valid = cost[matched_rows, matched_cols] < _UNREACHABLE
+        assignment[rows[matched_rows[valid]]] = cols[matched_cols[valid]]
+        return assignment
+
+    def close_all(self):
+        """End every active track, e.g. at the end of the video"""
+        if self.report_closed:
+            self._closed.append(self._active_tracks)
+            self._closed_count += len(self._active_tracks)
+        self._active_tracks = np.zeros(0, dtype=np.int64)
+        self._active_last_seen = np.zeros(0, dtype=np.int64)
+        self._active_state = np.zeros((0, 4))
+        self._active_cov = np.zeros((0, 4, 4))
+        self._active_time = np.zeros(0)
+
+    @property
+    def closed_track_count(self) -> int:
+        """Number of closed tracks not yet returned by :meth:`pop_closed_tracks`"""
+        return self._closed_count
+
+    def pop_closed_tracks(self) -> np.ndarray:
+        """Store indices of the tracks closed since the last call"""
+        closed = np.concatenate(self._closed) if self._closed else np.zeros(0, dtype=np.int64)
+        self._closed = []
+        self._closed_count = 0
+        return closed
+
+    @property
+    def active_track_count(self) -> int:
+        """Number of tracks currently eligible for matching"""
+        return len(self._active_tracks)
@@ -0,0 +1,245 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the synthetic renderer changes, so cached datasets are rebuilt
+SYNTHETIC_GENERATOR_VERSION = 1
+
+DATASET_CACHE_DIR = "data/cache"
+REAL_DATA_DIR = "data"
+RUNS_DIR = "runs/train"
+MODEL_PATH = "models/sperm_yolo.pt"
+MODEL_VERSIONS_DIR = "models/versions"
+
+# Per-process analyzer whose synthetic renderer the dataset workers share
+_sampler = None
+
+def dataset_key(params: Dict[str, Any]) -> str:
+    """Stable cache key for a synthetic dataset built from ``params``"""
+    payload = json.dumps(dict(params, generator_version=SYNTHETIC_GENERATOR_VERSION), sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _render_chunk(task: Tuple[str, int, int, int]) -> int:
+    """Render synthetic images ``[start, stop)`` of one split into ``split_dir``"""
+    global _sampler
+    split_dir, start, stop, seed = task
+    if _sampler is None:
+        from models.sperm_analyzer import SpermAnalyzer
+        _sampler = SpermAnalyzer()
+
+    for i in range(start, stop):
+        # Seeded per image, so the dataset does not depend on how it was chunked
+        np.random.seed((seed * 1_000_003 + i) % 2**32)
+        img, annotations = _sampler._synthetic_sample()
+        cv2.imwrite(os.path.join(split_dir, "images", f"synthetic_{i:05d}.jpg"), img)
+        with open(os.path.join(split_dir, "labels", f"synthetic_{i:05d}.txt"), 'w') as f:
+            f.write('\n'.join(annotations))
+    return stop - start
+
+def _real_image_dirs(real_data_dir: Optional[str], split: str) -> List[str]:
+    """Labelled images of a split under ``real_data_dir``, if there are any"""
+    if not real_data_dir:
+        return []
+    image_dir = os.path.abspath(os.path.join(real_data_dir, split, "images"))
+    return [image_dir] if glob.glob(os.path.join(image_dir, "*")) else []
+
+def prepare_dataset(train_images: int = 100, val_images: int = 20, seed: int = 0,
+                    workers: Optional[int] = None, cache_dir: str = DATASET_CACHE_DIR,
+                    real_data_dir: Optional[str] = REAL_DATA_DIR) -> Tuple[str, str]:
+    """Build (or reuse) the synthetic dataset and return ``(dataset yaml path, dataset key)``.
+
+    Images are rendered in parallel worker processes into a temporary
+    directory that is renamed into ``cache_dir/<key>`` once complete, so an
+    interrupted build is never reused. Labelled images under
+    ``real_data_dir/{train,val}/images`` are trained on alongside.
+    """
+    params = {"train_images": train_images, "val_images": val_images, "seed": seed}
+    key = dataset_key(params)
+    dataset_dir = os.path.abspath(os.path.join(cache_dir, key))
+
+    if os.path.isdir(dataset_dir):
+        logger.info(f"Reusing cached dataset {dataset_dir}")
+    else:
+        building_dir = f"{dataset_dir}.building-{os.getpid()}"
+        splits = {"train": train_images, "val": val_images}
+        tasks = []
+        workers = workers or os.cpu_count() or 1
+        for split_index, (split, count) in enumerate(splits.items()):
+            split_dir = os.path.join(building_dir, split)
+            os.makedirs(os.path.join(split_dir, "images"), exist_ok=True)
+            os.makedirs(os.path.join(split_dir, "labels"), exist_ok=True)
+            chunk = max(1, -(-count // workers))
+            tasks.extend((split_dir, start, min(start + chunk, count), seed * 2 + split_index)
+                         for start in range(0, count, chunk))
+
+        logger.info(f"Rendering {train_images + val_images} synthetic images with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = sum(pool.map(_render_chunk, tasks))
+
+        with open(os.path.join(building_dir, "params.json"), 'w') as f:
+            json.dump(dict(params, generator_version=SYNTHETIC_GENERATOR_VERSION, images=rendered), f, indent=2)
+        try:
+            os.replace(building_dir, dataset_dir)
+        except OSError:
+            # Another build of the same dataset finished first
+            if not os.path.isdir(dataset_dir):
+                raise
+            shutil.rmtree(building_dir)
+        logger.info(f"Dataset cached in {dataset_dir}")
+
+    # The config references the real data in place, so it is rewritten on every run
+    dataset_config = {
+        "train": [os.path.join(dataset_dir, "train", "images")] + _real_image_dirs(real_data_dir, "train"),
+        "val": [os.path.join(dataset_dir, "val", "images")] + _real_image_dirs(real_data_dir, "val"),
+        "nc": 1,  # Number of classes (sperm)
+        "names": ["sperm"]
+    }
+    yaml_path = os.path.join(dataset_dir, "sperm_dataset.yaml")
+    with open(yaml_path, 'w') as f:
+        for name, value in dataset_config.items():
+            f.write(f"{name}: {json.dumps(value)}\n")
+    return yaml_path, key
+
+def train_model(dataset_yaml: str, run_name: str, epochs: int = 100, imgsz: int = 640, batch: int = 16,
+                patience: int = 20, device: Optional[str] = None, base_weights: str = "yolov8n.pt",
+                loader_workers: int = 4, runs_dir: str = RUNS_DIR, resume: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """Train the detector and return ``(best weights path, final metrics)``.
+
+    A run is identified by ``runs_dir/run_name``; when it left a ``last.pt``
+    checkpoint behind and ``resume`` is set, training continues from there.
+    """
+    from ultralytics import YOLO
+
+    run_dir = os.path.join(runs_dir, run_name)
+    last_checkpoint = os.path.join(run_dir, "weights", "last.pt")
+    best_weights = os.path.join(run_dir, "weights", "best.pt")
+
+    if resume and os.path.exists(last_checkpoint):
+        logger.info(f"Resuming training from {last_checkpoint}")
+        model = YOLO(last_checkpoint)
+        try:
+            model.train(resume=True)
+        except AssertionError as e:
+            # ultralytics refuses to resume runs that already finished
+            logger.info(f"Nothing to resume: {e}")
+    else:
+        if os.path.isdir(run_dir):
+            shutil.rmtree(run_dir)
+        model = YOLO(base_weights)
+        model.train(
+            data=dataset_yaml,
+            epochs=epochs,
+            imgsz=imgsz,
+            batch=batch,
+            device=device,
+            patience=patience,
+            save=True,  # last.pt is checkpointed every epoch, so an interrupted run can resume
+            cache=True,
+            workers=loader_workers,
+            project=runs_dir,
+            name=run_name,
+            exist_ok=True
+        )
+
+    if not os.path.exists(best_weights):
+        raise RuntimeError(f"Training produced no weights in {run_dir}")
+
+    metrics = {}
+    trainer = getattr(model, "trainer", None)
+    if trainer is not None and getattr(trainer, "metrics", None):
+        metrics = {name: float(value) for name, value in trainer.metrics.items()}
+    return best_weights, metrics
+
+def publish_model(weights_path: str, metadata: Dict[str, Any], model_path: str = MODEL_PATH,
+                  versions_dir: str = MODEL_VERSIONS_DIR) -> str:
+    """Store ``weights_path`` as the next model version and make it the served model.
+
+    Every version keeps its weights and metadata under ``versions_dir/vN``.
+    ``model_path`` and its ``.json`` metadata are replaced atomically, so a
+    server starting meanwhile loads either the old or the new model.
+    """
+    os.makedirs(versions_dir, exist_ok=True)
+    existing = [int(name[1:]) for name in os.listdir(versions_dir) if name[:1] == "v" and name[1:].isdigit()]
+    version = f"v{max(existing, default=0) + 1}"
+    version_dir = os.path.join(versions_dir, version)
+    os.makedirs(version_dir)
+
+    metadata = dict(metadata, version=version, created_at=datetime.now().isoformat())
+    shutil.copy2(weights_path, os.path.join(version_dir, "sperm_yolo.pt"))
+    with open(os.path.join(version_dir, "metadata.json"), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    stem, _ = os.path.splitext(model_path)
+    for source, target in ((os.path.join(version_dir, "sperm_yolo.pt"), model_path),
+                           (os.path.join(version_dir, "metadata.json"), f"{stem}.json")):
+        staging = f"{target}.tmp"
+        shutil.copy2(source, staging)
+        os.replace(staging, target)
+
+    logger.info(f"Published model {version} to {model_path}")
+    return version
+
+def main():
+    """Prepare the dataset, train (or resume) and publish a new model version"""
+    parser = argparse.ArgumentParser(description="Offline training of the sperm detector")
+    parser.add_argument("--train-images", type=int, default=100, help="Synthetic training images")
+    parser.add_argument("--val-images", type=int, default=20, help="Synthetic validation images")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic dataset")
+    parser.add_argument("--workers", type=int, help="Dataset rendering processes (default: all cores)")
+    parser.add_argument("--real-data", default=REAL_DATA_DIR,
+                        help="Directory with labelled {train,val}/images and labels to train on as well")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--patience", type=int, default=20)
+    parser.add_argument("--device", help="Training device, e.g. cpu or 0 (default: auto)")
+    parser.add_argument("--base-weights", default="yolov8n.pt", help="Weights to fine-tune from")
+    parser.add_argument("--run-name", help="Run directory under runs/train (default: derived from the settings)")
+    parser.add_argument("--no-resume", action="store_true", help="Start over even if a checkpoint exists")
+    parser.add_argument("--prepare-only", action="store_true", help="Only build the dataset")
+    parser.add_argument("--no-publish", action="store_true", help="Train without replacing the served model")
+    args = parser.parse_args()
+
+    dataset_yaml, key = prepare_dataset(args.train_images, args.val_images, args.seed,
+                                        workers=args.workers, real_data_dir=args.real_data)
+    if args.prepare_only:
+        print(dataset_yaml)
+        return
+
+    run_name = args.run_name or f"sperm_{key}_e{args.epochs}_img{args.imgsz}"
+    best_weights, metrics = train_model(
+        dataset_yaml, run_name, epochs=args.epochs, imgsz=args.imgsz, batch=args.batch,
+        patience=args.patience, device=args.device, base_weights=args.base_weights,
+        resume=not args.no_resume
+    )
+
+    if args.no_publish:
+        print(best_weights)
+        return
+
+    version = publish_model(best_weights, {
+        "dataset_key": key,
+        "dataset": {"train_images": args.train_images, "val_images": args.val_images, "seed": args.seed},
+        "run": run_name,
+        "base_weights": args.base_weights,
+        "epochs": args.epochs,
+        "imgsz": args.imgsz,
+        "metrics": metrics
+    })
+    print(version)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_PATH = os.path.join(BACKEND_DIR, "import_profile.txt")
+
+# Must not be loaded by importing the API; they are imported on first use
+DEFERRED_MODULES = ("torch", "ultralytics", "matplotlib", "seaborn", "pandas", "scipy")
+
+# Loaded by importing the API on purpose, each within its own budget in ms (cumulative, so
+# including numpy when cv2 imports it first). cv2 costs about 20 ms on top of numpy, every
+# analysis path uses it, and ultralytics imports it anyway when the model loads in the
+# background right after startup
+EAGER_MODULES = {"cv2": 200.0}
+
+def profile_import(module: str = "main") -> Dict[str, Any]:
+    """Import ``module`` in a fresh interpreter with ``-X importtime`` and collect the timings.
+
+    Runs in a temporary working directory so the import leaves no files behind.
+    """
+    script = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory() as workdir:
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                                   cwd=workdir, env=env, capture_output=True, text=True, check=True)
+
+    # Lines look like "import time:  self [us] | cumulative | <indent>name"
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append({
+            "name": name.strip(),
+            "depth": depth,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+
+    loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+    # A module is listed where it was first imported; later imports hit the cache
+    eager_ms = {}
+    for entry in modules:
+        if entry["name"] in EAGER_MODULES:
+            eager_ms.setdefault(entry["name"], entry["cumulative_ms"])
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "total_ms": sum(entry["cumulative_ms"] for entry in modules if entry["depth"] == 0),
+        "modules": modules,
+        "deferred_loaded": [name for name in DEFERRED_MODULES if name in loaded],
+        "eager_ms": eager_ms
+    }
+
+def format_profile(profile: Dict[str, Any], top: int = 25) -> str:
+    """Plain-text report of the slowest direct and indirect imports"""
+    heaviest: List[Dict[str, Any]] = sorted(profile["modules"], key=lambda entry: entry["cumulative_ms"], reverse=True)
+    lines = [
+        f"Import profile of '{profile['module']}' (python {profile['python']})",
+        f"Total import time: {profile['total_ms']:.0f} ms",
+        f"Deferred modules loaded: {', '.join(profile['deferred_loaded']) or 'none'}",
+        "Eager modules: " + (", ".join(
+            f"{name} {ms:.0f} ms (budget {EAGER_MODULES[name]:.0f} ms)" for name, ms in profile["eager_ms"].items()
+        ) or "none"),
+        "",
+        f"{'cumulative ms':>14} {'self ms':>9}  module"
+    ]
+    for entry in heaviest[:top]:
+        lines.append(f"{entry['cumulative_ms']:14.1f} {entry['self_ms']:9.1f}  {'  ' * entry['depth']}{entry['name']}")
+    return "\n".join(lines) + "\n"
+
+def main():
+    """Print the API import profile and check it against the startup budget"""
+    parser = argparse.ArgumentParser(description="Import-time profile of the API process")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules in the report")
+    parser.add_argument("--budget-ms", type=float, default=1000, help="Fail above this total import time")
+    parser.add_argument("--write", action="store_true", help=f"Update {os.path.basename(PROFILE_PATH)}")
+    args = parser.parse_args()
+
+    profile = profile_import(args.module)
+    report = format_profile(profile, args.top)
+    print(report, end="")
+    if args.write:
+        with open(PROFILE_PATH, 'w') as f:
+            f.write(report)
+
+    if profile["deferred_loaded"]:
+        sys.exit(f"Importing {args.module} loads {', '.join(profile['deferred_loaded'])}; import them on first use")
+    over_budget = [f"{name} ({ms:.0f} ms)" for name, ms in profile["eager_ms"].items() if ms > EAGER_MODULES[name]]
+    if over_budget:
+        sys.exit(f"Eager imports exceed their budget: {', '.join(over_budget)}")
+    if profile["total_ms"] > args.budget_ms:
+        sys.exit(f"Import time {profile['total_ms']:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ("queued", "running", "completed", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    options TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress REAL,
+    progress_detail TEXT,
+    result_id TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    updated_at TEXT NOT NULL,
+    owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_created ON jobs (state, created_at);
+"""
+
+# Columns added after the first schema, created on databases that predate them
+_ADDED_COLUMNS = {"owner": "TEXT", "lease_expires_at": "REAL"}
+
+# Coroutine that runs one job and returns its result id; receives the job and a progress callback
+JobHandler = Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Awaitable[str]]
+
+class JobQueue:
+    """Persistent analysis job queue backed by SQLite, drained by a bounded pool of asyncio workers.
+
+    Jobs are rows in ``db_path``; claiming a job is a single ``BEGIN
+    IMMEDIATE`` transaction, so several server processes can share the
+    database. A claimed job records its owner (this queue instance) and a
+    lease of ``lease_seconds`` that the owner renews while it runs. Running
+    jobs whose lease expired belonged to a process that died and are queued
+    again by any live queue, up to ``max_attempts`` runs; jobs of live
+    sibling processes are left alone.
+    """
+
+    def __init__(self, handler: JobHandler, db_path: str = "static/jobs.db", workers: int = 2,
+                 max_attempts: int = 3, poll_interval: float = 2.0, progress_interval: float = 1.0,
+                 lease_seconds: float = 60.0):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        existing = {row["name"] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        for name, column_type in _ADDED_COLUMNS.items():
+            if name not in existing:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {column_type}")
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._db_lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    async def start(self):
+        """Requeue jobs whose owner died and start the workers and the lease heartbeat"""
+        self._requeue_expired()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        """Cancel the workers and hand their running jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # A shutdown is not a failed attempt
+        with self._db_lock:
+            requeued = self._connection.execute(
+                "UPDATE jobs SET state = 'queued', attempts = attempts - 1, owner = NULL, lease_expires_at = NULL, "
+                "updated_at = ? WHERE state = 'running' AND owner = ?",
+                (self._now(), self.owner)
+            ).rowcount
+        if requeued:
+            logger.info(f"Requeued {requeued} analysis jobs on shutdown")
+
+    def _requeue_expired(self):
+        """Queue again the running jobs whose owner stopped renewing their lease"""
+        now = self._now()
+        expired = time.time()
+        with self._db_lock:
+            self._connection.execute(
+                "UPDATE jobs SET state = 'failed', error = 'Interrupted too many times', owner = NULL, "
+                "finished_at = ?, updated_at = ? "
+                "WHERE state = 'running' AND attempts >= ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (now, now, self.max_attempts, expired)
+            )
+            requeued = self._connection.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE state = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                (now, expired)
+            ).rowcount
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted analysis jobs")
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _heartbeat(self):
+        """Renew the leases of this queue's running jobs and recover expired ones"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            self._execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE state = 'running' AND owner = ?",
+                (time.time() + self.lease_seconds, self.owner)
+            )
+            self._requeue_expired()
+
+    def submit(self, file_id: str, file_path: str, file_type: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a new job and return its status"""
+        job_id = str(uuid.uuid4())
+        now = self._now()
+        self._execute(
+            "INSERT INTO jobs (job_id, file_id, file_path, file_type, options, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, file_id, file_path, file_type, json.dumps(options or {}), now, now)
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status, or ``None`` for an unknown id"""
+        rows = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["options"] = json.loads(job["options"])
+        job["progress_detail"] = json.loads(job["progress_detail"]) if job["progress_detail"] else None
+        if job["state"] == "queued":
+            job["queue_position"] = self._execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND created_at <= ?", (job["created_at"],)
+            )[0][0]
+        return job
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running"""
+        with self._db_lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    "SELECT job_id FROM jobs WHERE state = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchall()
+                if not rows:
+                    self._connection.execute("COMMIT")
+                    return None
+                now = self._now()
+                self._connection.execute(
+                    "UPDATE jobs SET state = 'running', attempts = attempts + 1, owner = ?, lease_expires_at = ?, "
+                    "started_at = ?, updated_at = ? WHERE job_id = ?",
+                    (self.owner, time.time() + self.lease_seconds, now, now, rows[0]["job_id"])
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        return self.get(rows[0]["job_id"])
+
+    def _finish(self, job_id: str, state: str, result_id: Optional[str] = None, error: Optional[str] = None):
+        # Only while this queue still owns the job: a job requeued after its lease
+        # expired belongs to whichever process runs it now
+        now = self._now()
+        with self._db_lock:
+            finished = self._connection.execute(
+                "UPDATE jobs SET state = ?, result_id = ?, error = ?, progress = CASE WHEN ? = 'completed' THEN 1.0 ELSE progress END, "
+                "owner = NULL, lease_expires_at = NULL, finished_at = ?, updated_at = ? "
+                "WHERE job_id = ? AND state = 'running' AND owner = ?",
+                (state, result_id, error, state, now, now, job_id, self.owner)
+            ).rowcount
+        if not finished:
+            logger.warning(f"Job {job_id} lost its lease before finishing; its outcome was not recorded")
+
+    def _progress_callback(self, job_id: str) -> Callable[[Dict[str, Any]], None]:
+        """Thread-safe, throttled progress writer for one job"""
+        last_written = [0.0]
+
+        def on_progress(progress: Dict[str, Any]):
+            now = time.monotonic()
+            if now - last_written[0] < self.progress_interval:
+                return
+            last_written[0] = now
+            self._execute(
+                "UPDATE jobs SET progress = ?, progress_detail = ?, updated_at = ? WHERE job_id = ? AND owner = ?",
+                (progress.get("progress"), json.dumps(progress), self._now(), job_id, self.owner)
+            )
+
+        return on_progress
+
+    async def _worker(self, index: int):
+        while True:
+            job = self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    # Poll as well, for jobs submitted by other server processes
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"Worker {index} running job {job['job_id']} for file {job['file_id']}")
+            try:
+                result_id = await self.handler(job, self._progress_callback(job["job_id"]))
+                self._finish(job["job_id"], "completed", result_id=result_id)
+            except asyncio.CancelledError:
+                # Requeued by stop(), or by another process once the lease expires
+                raise
+            except Exception as e:
+                logger.error(f"Job {job['job_id']} failed: {e}")
+                self._finish(job["job_id"], "failed", error=str(e))
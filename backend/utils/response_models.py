@@ -106,6 +106,20 @@ class AnalysisResult(BaseModel):
     chart_paths: Dict[str, str] = Field(description="Paths to chart files")
     created_at: str = Field(description="ISO timestamp of result creation")
 
+class JobStatus(BaseModel):
+    job_id: str = Field(description="Unique job identifier")
+    file_id: str = Field(description="Identifier of the file being analyzed")
+    state: str = Field(description="queued, running, completed or failed")
+    progress: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="Fraction of the analysis done, when known")
+    progress_detail: Optional[Dict[str, Any]] = Field(default=None, description="Latest progress update of a video analysis")
+    queue_position: Optional[int] = Field(default=None, ge=1, description="Position in the queue while queued")
+    attempts: int = Field(ge=0, description="Number of times the job was started")
+    result_id: Optional[str] = Field(default=None, description="Result identifier once completed")
+    error: Optional[str] = Field(default=None, description="Error message if the job failed")
+    created_at: str = Field(description="ISO timestamp of submission")
+    started_at: Optional[str] = Field(default=None, description="ISO timestamp of the last start")
+    finished_at: Optional[str] = Field(default=None, description="ISO timestamp of completion or failure")
+
 class ChartData(BaseModel):
     result_id: str = Field(description="Result identifier")
     analysis_type: str = Field(description="Type of analysis")
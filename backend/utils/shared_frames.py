@@ -0,0 +1,43 @@
+import numpy as np
+from multiprocessing import shared_memory
+from typing import List, Tuple
+
+# (shared memory block name, array shape, dtype string) - cheap to pickle
+FrameBatchDescriptor = Tuple[str, Tuple[int, ...], str]
+
+class SharedFrameBatch:
+    """A stack of equally sized frames stored in a shared-memory block.
+
+    The owner copies frames in once and passes only the small descriptor to
+    worker processes, which map the same memory instead of unpickling pixels.
+    """
+
+    def __init__(self, frames: List[np.ndarray]):
+        if not frames:
+            raise ValueError("Cannot share an empty frame batch")
+
+        first = frames[0]
+        self.shape = (len(frames),) + first.shape
+        self.dtype = first.dtype
+
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * self.dtype.itemsize)
+        stacked = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        for i, frame in enumerate(frames):
+            stacked[i] = frame
+        del stacked
+
+    def descriptor(self) -> FrameBatchDescriptor:
+        """Return the picklable handle workers use to attach to the batch"""
+        return self.shm.name, self.shape, self.dtype.str
+
+    def release(self):
+        """Close and free the shared-memory block (owner side)"""
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_frame_batch(descriptor: FrameBatchDescriptor) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """Map a shared frame batch in a worker; close the returned block when done"""
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    frames = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return shm, frames
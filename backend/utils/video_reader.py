@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+import queue
+import threading
+from typing import Iterator, Optional, Tuple
+import logging
+
+from utils.frame_sampling import FixedFrameSampler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Marks the end of the decoded stream in the frame queue
+_END_OF_STREAM = object()
+
+class VideoFrameReader:
+    """Decode sampled video frames on a background thread into a bounded queue.
+
+    Skipped frames are only grabbed (demuxed) and never converted to images;
+    frames on the sampler's probe grid are retrieved, and those the sampler
+    accepts are handed to the consumer in frame order.
+    The queue bound keeps decoding at most ``queue_size`` frames ahead of
+    inference so memory stays flat regardless of clip length.
+
+    ``start_frame``/``stop_frame`` restrict decoding to one time segment; the
+    capture seeks to ``start_frame`` and frame numbers stay absolute.
+    """
+
+    def __init__(self, video_path: str, queue_size: int = 16, start_frame: int = 0,
+                 stop_frame: Optional[int] = None):
+        self.video_path = video_path
+        self.queue_size = queue_size
+        self.start_frame = start_frame
+        self.stop_frame = stop_frame
+
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frames_decoded = 0
+        if start_frame > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        self.sampler = None
+
+        self._frames: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def start(self, frame_skip: int = 1, sampler=None):
+        """Start the decoder thread, keeping every ``frame_skip``-th frame or the frames ``sampler`` accepts"""
+        self.sampler = sampler or FixedFrameSampler(frame_skip)
+        self._thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _decode_loop(self):
+        """Producer: grab every frame, retrieve only the probed ones"""
+        probe_step = self.sampler.probe_step
+        frame_number = self.start_frame
+        try:
+            while not self._stop_event.is_set():
+                if self.stop_frame is not None and frame_number >= self.stop_frame:
+                    break
+                if not self.cap.grab():
+                    break
+
+                if frame_number % probe_step == 0:
+                    ret, frame = self.cap.retrieve()
+                    if not ret:
+                        break
+                    if self.sampler.accept(frame_number, frame):
+                        if not self._put((frame_number, frame)):
+                            break
+                        self.frames_decoded += 1
+
+                frame_number += 1
+        except Exception as e:
+            logger.error(f"Video decoding failed: {e}")
+            self._error = e
+        finally:
+            self.cap.release()
+            self._put(_END_OF_STREAM)
+
+    def _put(self, item) -> bool:
+        """Block until the queue has room, giving up if the reader is stopped"""
+        while not self._stop_event.is_set():
+            try:
+                self._frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Consumer: yield ``(frame_number, frame)`` pairs until the stream ends"""
+        if self._thread is None:
+            self.start()
+
+        while True:
+            item = self._frames.get()
+            if item is _END_OF_STREAM:
+                break
+            yield item
+
+        if self._error is not None:
+            raise self._error
+
+    def stop(self):
+        """Stop the decoder thread and release the capture"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False